@@ -3,6 +3,7 @@ import streamlit as st
 from src.cliente import render_cliente_view
 from src.direccion import render_direccion_view
 from src.styles import apply_custom_css
+from src.loader import show_data_status
 
 # ---------------------------
 # Configuración general
@@ -23,6 +24,8 @@ vista = st.sidebar.radio(
     ["Cliente", "Dirección"]
 )
 
+show_data_status()
+
 if vista == "Cliente":
     render_cliente_view()
 else:
@@ -0,0 +1,82 @@
+"""
+SIPOR Dashboard - Benchmark: date range queries
+Latency of a 30-day window and of a single cut date on a synthetic event
+partition, comparing the previous boolean-mask filter with the sorted
+index (filter_by_date_range) and the per-day DateIndex offsets.
+
+Usage:
+    python benchmarks/bench_date_slice.py [--rows 2400000] [--days 1095]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dataset import build_dataset  # noqa: E402
+from src.loader import filter_by_date, filter_by_date_range  # noqa: E402
+
+
+def synthetic_base_operacion(rows, days, seed=7):
+    """Random Base_Operacion-like frame, half inventory and half events"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2023-01-01')
+    return pd.DataFrame({
+        'fecha': start + pd.to_timedelta(rng.integers(0, days, rows), unit='D'),
+        'zona': rng.choice(['Patios', 'Bodega'], rows),
+        'subzona': rng.choice([f'Subzona {i}' for i in range(20)], rows),
+        'subtipo_insumo': rng.choice(['77 TM', '35 TM', 'NPK-PPP', 'NICA'], rows),
+        'cantidad': rng.integers(0, 100, rows),
+        'tipo_registro': rng.choice(['estado', 'evento'], rows),
+        'estado': rng.choice(['disponible', 'reparar', 'clasificar'], rows),
+        'tipo_evento': rng.choice(['reparada', 'baja'], rows),
+        'insumo': rng.choice(['estiba', 'carpa', 'plastico', 'espacio'], rows),
+        'turno': rng.choice(['AM', 'PM'], rows),
+    })
+
+
+def mask_filter(df, start_date, end_date):
+    """Previous implementation: full boolean mask over every row"""
+    return df[(df['fecha'] >= start_date) & (df['fecha'] <= end_date)]
+
+
+def bench(label, fn, number):
+    secs = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"  {label:<38} {secs * 1e6:>10.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=2_400_000)
+    parser.add_argument('--days', type=int, default=1095)
+    args = parser.parse_args()
+
+    ds = build_dataset(synthetic_base_operacion(args.rows, args.days))
+    evt = ds.eventos
+    flat = evt.reset_index(drop=True)
+    end = evt['fecha'].iloc[-1]
+    start = end - pd.Timedelta(days=30)
+    date_index = ds.date_index['eventos']
+    print(f"Event partition: {len(evt):,} rows over {len(date_index.days):,} days")
+
+    print("\n30-day window")
+    bench("boolean mask", lambda: mask_filter(flat, start, end), 5)
+    bench("filter_by_date_range (sorted index)", lambda: filter_by_date_range(evt, start, end), 200)
+    bench("DateIndex.bounds + iloc", lambda: evt.iloc[slice(*date_index.bounds(start, end))], 200)
+
+    print("\nSingle cut date")
+    bench("boolean mask", lambda: flat[flat['fecha'] == end], 5)
+    bench("filter_by_date (sorted index)", lambda: filter_by_date(evt, end), 200)
+    bench("DateIndex.day_bounds + iloc", lambda: evt.iloc[slice(*date_index.day_bounds(end))], 200)
+
+    # Same rows either way
+    assert len(filter_by_date_range(evt, start, end)) == len(mask_filter(flat, start, end))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+SIPOR Dashboard - Benchmark: memory per row
+Reports bytes per row of Base_Operacion before (parsed sheet, object/str
+columns) and after dictionary encoding (categoricals, int32 cantidad,
+day-resolution fecha), overall and per column.
+
+Usage:
+    python benchmarks/bench_memory.py [--workbook Balance_Insumos.xlsx]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dataset import bytes_per_row, encode_dimensions  # noqa: E402
+from src.loader import parse_base_operacion  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workbook', default='Balance_Insumos.xlsx')
+    args = parser.parse_args()
+
+    before = parse_base_operacion(args.workbook)
+    after = encode_dimensions(before)
+    rows = len(before)
+
+    print(f"Base_Operacion: {rows:,} rows")
+    print(f"  {'column':<16} {'before':>14} {'after':>14} {'B/row':>14}")
+    mem_before = before.memory_usage(deep=True, index=False)
+    mem_after = after.memory_usage(deep=True, index=False)
+    for col in before.columns:
+        b, a = mem_before[col] / rows, mem_after[col] / rows
+        print(f"  {col:<16} {str(before[col].dtype):>14} {str(after[col].dtype):>14} "
+              f"{b:>6.1f} -> {a:<5.1f}")
+
+    total_before, total_after = bytes_per_row(before), bytes_per_row(after)
+    print(f"\n  bytes/row: {total_before:.1f} -> {total_after:.1f} "
+          f"({total_before / total_after:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+SIPOR Dashboard - Benchmark: Base_Operacion readers
+Compares the openpyxl path (pandas.read_excel) with the streaming single-sheet
+reader on the shipped workbook and on an N-times replicated copy.
+
+Usage:
+    python benchmarks/bench_reader.py [--factor 50] [--repeat 3]
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.loader import parse_base_operacion  # noqa: E402
+
+DEFAULT_WORKBOOK = 'Balance_Insumos.xlsx'
+
+_ROW_RE = re.compile(r'<row [^>]*?r="(\d+)".*?</row>', re.DOTALL)
+_SHEET_DATA_RE = re.compile(r'(<sheetData>)(.*?)(</sheetData>)', re.DOTALL)
+
+
+def _replicate_sheet_xml(xml, factor):
+    """Repeat every data row of a worksheet `factor` times, renumbering refs"""
+    match = _SHEET_DATA_RE.search(xml)
+    if not match:
+        return xml
+
+    rows = [m.group(0) for m in _ROW_RE.finditer(match.group(2))]
+    if len(rows) < 2:
+        return xml
+
+    header, body = rows[0], rows[1:]
+    out = [header]
+    next_row = 2
+    for _ in range(factor):
+        for row in body:
+            n = next_row
+            row = re.sub(r'(<row [^>]*?r=")\d+"', lambda m: f'{m.group(1)}{n}"', row, count=1)
+            row = re.sub(r'( r="[A-Z]+)\d+"', lambda m: f'{m.group(1)}{n}"', row)
+            row = re.sub(r' spans="[^"]*"', '', row)
+            out.append(row)
+            next_row += 1
+
+    xml = xml[:match.start(2)] + ''.join(out) + xml[match.end(2):]
+    return re.sub(r'<dimension ref="([A-Z]+)1:([A-Z]+)\d+"/>',
+                  lambda m: f'<dimension ref="{m.group(1)}1:{m.group(2)}{next_row - 1}"/>', xml)
+
+
+def build_replicated_workbook(src_path, dst_path, factor):
+    """Copy the workbook, replicating the rows of every worksheet"""
+    with zipfile.ZipFile(src_path) as zin, \
+            zipfile.ZipFile(dst_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            if item.filename.startswith('xl/worksheets/sheet'):
+                data = _replicate_sheet_xml(data.decode('utf-8'), factor).encode('utf-8')
+            zout.writestr(item, data)
+
+
+def measure(reader, path, repeat):
+    """Best wall time and peak traced memory for one reader"""
+    best = float('inf')
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = parse_base_operacion(path, reader=reader)
+        best = min(best, time.perf_counter() - start)
+        rows = len(df)
+
+    tracemalloc.start()
+    parse_base_operacion(path, reader=reader)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, best, peak
+
+
+def report(label, path, repeat):
+    size_mb = os.path.getsize(path) / 1e6
+    print(f"\n{label}: {path} ({size_mb:.1f} MB)")
+    print(f"  {'reader':<10} {'rows':>9} {'time (s)':>10} {'peak MB':>9}")
+    results = {}
+    for reader in ('openpyxl', 'stream'):
+        rows, secs, peak = measure(reader, path, repeat)
+        results[reader] = secs
+        print(f"  {reader:<10} {rows:>9,} {secs:>10.3f} {peak / 1e6:>9.1f}")
+    print(f"  speedup: {results['openpyxl'] / results['stream']:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workbook', default=DEFAULT_WORKBOOK)
+    parser.add_argument('--factor', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    report("Shipped workbook", args.workbook, args.repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        big = os.path.join(tmp, f'Balance_Insumos_x{args.factor}.xlsx')
+        build_replicated_workbook(args.workbook, big, args.factor)
+        report(f"Replicated x{args.factor}", big, max(1, args.repeat // 3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+SIPOR Dashboard - Batch Reports
+Balance PDFs for many cut dates and workbooks, without Streamlit. Usage:
+
+    python -m src.batch_reports Balance_Insumos.xlsx --desde 2026-01-01 --hasta 2026-01-31 -o reportes
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src import config
+from src.cliente import build_report_data, build_report_figures, format_cut_date
+from src.cube import get_kpi_cube
+from src.loader import build_workbook_dataset
+from src.pdf_generator import generate_pdf_report
+
+
+def report_path(output_dir, workbook, fecha):
+    stem = os.path.splitext(os.path.basename(workbook))[0]
+    return os.path.join(output_dir, f"SIPOR_Balance_{stem}_{fecha.strftime('%Y%m%d')}.pdf")
+
+
+def select_cuts(dates, start=None, end=None, latest_only=False):
+    """Cut dates of a cube within [start, end] (inclusive), or only the last one"""
+    cuts = [pd.Timestamp(d) for d in dates]
+    if start is not None:
+        cuts = [d for d in cuts if d >= pd.Timestamp(start)]
+    if end is not None:
+        cuts = [d for d in cuts if d <= pd.Timestamp(end)]
+    return cuts[-1:] if latest_only else cuts
+
+
+def _render_report(path, date_str, kpi_data, chart_data, renderer):
+    """Worker: one PDF written to `path` (runs in a pool process)"""
+    if renderer == 'vector':
+        figs = dict.fromkeys(chart_data)  # vector charts only need the rows
+    else:
+        figs = build_report_figures(chart_data)
+    pdf_bytes = generate_pdf_report(date_str, kpi_data, figs, chart_data, renderer=renderer)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        fh.write(pdf_bytes)
+    os.replace(tmp_path, path)
+    return path
+
+
+def iter_report_jobs(workbooks, output_dir, start=None, end=None, latest_only=False):
+    """
+    (path, date_str, kpi_data, chart_data) per report
+
+    The loader runs once per workbook, here in the parent process; workers
+    only receive the small per-cut aggregates.
+    """
+    for workbook in workbooks:
+        cube = get_kpi_cube(build_workbook_dataset(workbook))
+        for fecha in select_cuts(cube.dates, start, end, latest_only):
+            kpi_data, chart_data = build_report_data(cube.cut(fecha))
+            yield report_path(output_dir, workbook, fecha), format_cut_date(fecha), kpi_data, chart_data
+
+
+def run_batch(workbooks, output_dir, start=None, end=None, latest_only=False, workers=None, renderer=None):
+    """
+    Generate the reports across a process pool
+
+    Returns:
+        dict: {'reports', 'seconds', 'paths'}
+    """
+    renderer = renderer or config.PDF_CHART_RENDERER
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_render_report, path, date_str, kpi_data, chart_data, renderer)
+            for path, date_str, kpi_data, chart_data in iter_report_jobs(
+                workbooks, output_dir, start, end, latest_only
+            )
+        ]
+        paths = [f.result() for f in futures]
+    return {'reports': len(paths), 'seconds': time.perf_counter() - started, 'paths': paths}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('workbooks', nargs='+', help="Libros de Excel con la hoja Base_Operacion")
+    parser.add_argument('-o', '--output', default='reportes', help="Carpeta de salida de los PDF")
+    parser.add_argument('--desde', help="Primera fecha de corte (AAAA-MM-DD)")
+    parser.add_argument('--hasta', help="Última fecha de corte (AAAA-MM-DD)")
+    parser.add_argument('--ultimo', action='store_true', help="Solo el último corte de cada libro")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos en paralelo (por defecto, uno por CPU)")
+    parser.add_argument('--graficas', choices=['vector', 'kaleido'], default=None,
+                        help="Dibujo de las gráficas (por defecto, config.PDF_CHART_RENDERER)")
+    args = parser.parse_args(argv)
+
+    stats = run_batch(args.workbooks, args.output, args.desde, args.hasta, args.ultimo, args.workers, args.graficas)
+    rate = stats['reports'] / stats['seconds'] if stats['seconds'] else 0.0
+    print(f"{stats['reports']} reportes en {stats['seconds']:.2f} s ({rate:.1f} reportes/s) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
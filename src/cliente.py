@@ -6,22 +6,49 @@ Reporte Final PDF (Header Yara / Gráficas Agrupadas)
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import base64
+import time
 
-from src.styles import COLORS, PATIO_WARM, BODEGA_COLD, show_header, get_plotly_template
-from src.loader import load_inventario, validate_data_exists
+from src.styles import COLORS, PATIO_WARM, BODEGA_COLD, LOCATION_COLORS, show_header, get_plotly_template
+from src.loader import load_dataset, validate_partition
+from src.dataset import eq_mask
+from src.cube import get_kpi_cube
+from src.figure_cache import cached_figure
 
 def render_cliente_view():
     """Render the client view as a static PDF report with Yara branding"""
     
     # 1. Load Data
-    df_inventario = load_inventario()
-    if not validate_data_exists(df_inventario, "Inventario"):
+    ds = load_dataset()
+    if not validate_partition('inventario', "Inventario", ds):
         return
     
     # Snapshot Logic
-    latest_date = df_inventario['fecha'].max()
-    df = df_inventario[df_inventario['fecha'] == latest_date].copy()
+    # Every KPI and chart below is a lookup into the cube of this dataset
+    # version (sums per cut date), so switching cuts never groups rows
+    cube = get_kpi_cube(ds)
+    cut_dates = [pd.Timestamp(d) for d in cube.dates[::-1]]  # newest first
+    if not cut_dates:
+        st.warning("⚠️ No hay fechas de corte con inventario")
+        return
+
+    sel1, sel2 = st.columns(2)
+    with sel1:
+        latest_date = st.selectbox(
+            "Fecha de corte", cut_dates, format_func=format_cut_date, key='cliente_corte'
+        )
+    with sel2:
+        compare_date = st.selectbox(
+            "Comparar con", [None] + [d for d in cut_dates if d != latest_date],
+            format_func=lambda d: "— Sin comparación —" if d is None else format_cut_date(d),
+            key='cliente_comparar'
+        )
+
+    cut = cube.cut(latest_date)
+    # Cuts shown side by side: the selected one, then the comparison one
+    cuts = [cut] if compare_date is None else [cut, cube.cut(compare_date)]
+    corte_label = format_cut_date(latest_date)
+    if compare_date is not None:
+        corte_label += f" vs {format_cut_date(compare_date)}"
     
     # --- 1. ENCABEZADO YARA (Contextual) ---
     c_head1, c_head2 = st.columns([0.5, 6])
@@ -41,7 +68,7 @@ def render_cliente_view():
             </span>
             <span style="border-left: 2px solid #ddd; height: 20px; margin-right: 20px;"></span>
             <span style="font-family: Arial, sans-serif; font-size: 14px; color: {COLORS['gray']};">
-                Corte: <b>{latest_date.strftime('%d-%m-%Y')}</b>
+                Corte: <b>{corte_label}</b>
             </span>
         </div>
         """, unsafe_allow_html=True)
@@ -50,36 +77,33 @@ def render_cliente_view():
     st.markdown(f"<h3 style='text-align:center; margin-top:-20px; color:{COLORS['blue']}'>BALANCE ACTUAL DE INSUMOS</h3>", unsafe_allow_html=True)
     st.markdown("---")
 
-    # Data Subsets
-    df_estibas = df[df['insumo'].astype(str).str.contains("Estiba", case=False, na=False)]
-    df_carpas = df[df['insumo'].astype(str).str.contains("Carpa", case=False, na=False)]
-    df_plasticos = df[df['insumo'].astype(str).str.contains("Plastico|Plástico", case=False, na=False)]
-    df_espacios = df[df['insumo'].astype(str).str.contains("Espacio", case=False, na=False)]
-
     # --- 2. KPIs (UNA SOLA FILA) ---
-    k1, k2, k3, k4 = st.columns(4)
-    
-    # ESTIBAS
-    with k1:
-        render_kpi_group("ESTIBAS", df_estibas, ['Disponible', 'Por Reparar']) 
-        
-    # CARPAS
-    with k2:
-        render_kpi_group("CARPAS", df_carpas, ['Disponible', 'Por Reparar'])
-        
-    # PLASTICOS
-    with k3:
-        render_kpi_group("PLÁSTICOS", df_plasticos, ['Disponible'])
+    if len(cuts) > 1:
+        render_cut_comparison(cuts[0], cuts[1])
+    else:
+        k1, k2, k3, k4 = st.columns(4)
         
-    # ESPACIOS
-    with k4:
-        render_espacios_kpi(df_espacios)
+        # ESTIBAS
+        with k1:
+            render_kpi_group("ESTIBAS", cut, 'estiba', ['Disponible', 'Por Reparar']) 
+            
+        # CARPAS
+        with k2:
+            render_kpi_group("CARPAS", cut, 'carpa', ['Disponible', 'Por Reparar'])
+            
+        # PLASTICOS
+        with k3:
+            render_kpi_group("PLÁSTICOS", cut, 'plastico', ['Disponible'])
+            
+        # ESPACIOS
+        with k4:
+            render_espacios_kpi(cut)
         
     st.markdown("---")
 
     # ... (Charts Section) ...
     
-    # Store figures for PDF
+    # Store figures for PDF (selected cut only)
     figs = {
         'estibas': None,
         'carpas': None,
@@ -88,173 +112,213 @@ def render_cliente_view():
     }
 
     # Chart 1: Estibas
-    if not df_estibas.empty:
-        figs['estibas'] = create_subzone_grouped_chart(df_estibas, "Estibas")
-        st.plotly_chart(figs['estibas'], use_container_width=True)
+    if any(c.has('estiba') for c in cuts):
+        figs['estibas'] = render_cut_charts(
+            cuts, 'estiba', lambda c: create_subzone_grouped_chart(c.rows('subzona', 'estiba'), "Estibas", ds.version)
+        )
     
     # Chart 2: Carpas
-    if not df_carpas.empty:
+    if any(c.has('carpa') for c in cuts):
         st.markdown("---")
-        figs['carpas'] = create_subzone_grouped_chart(df_carpas, "Carpas")
-        st.plotly_chart(figs['carpas'], use_container_width=True)
+        figs['carpas'] = render_cut_charts(
+            cuts, 'carpa', lambda c: create_subzone_grouped_chart(c.rows('subzona', 'carpa'), "Carpas", ds.version)
+        )
         
     # Chart 3: Plasticos
-    if not df_plasticos.empty:
+    if any(c.has('plastico') for c in cuts):
         st.markdown("---")
-        figs['plasticos'] = create_subzone_grouped_chart(df_plasticos, "Plásticos")
-        st.plotly_chart(figs['plasticos'], use_container_width=True)
+        figs['plasticos'] = render_cut_charts(
+            cuts, 'plastico', lambda c: create_subzone_grouped_chart(c.rows('subzona', 'plastico'), "Plásticos", ds.version)
+        )
 
     # Chart 4: Espacios
-    if not df_espacios.empty:
+    if any(c.has('espacio') for c in cuts):
         st.markdown("---")
         st.markdown(f"#### 🏗️ Disponibilidad de Espacios")
-        figs['espacios'] = create_espacios_chart(df_espacios)
-        st.plotly_chart(figs['espacios'], use_container_width=True)
+        figs['espacios'] = render_cut_charts(
+            cuts, 'espacio', lambda c: create_espacios_chart(c.rows('espacios', 'espacio'), ds.version)
+        )
 
     # --- PDF EXPORT LOGIC ---
     # Moved to sidebar or bottom? User wants "Button".
     st.markdown("---")
     
-    # Prepare Data for PDF KPIs
+    # Prepare Data for PDF KPIs (+ rows behind each chart)
+    kpi_data, chart_data = build_report_data(cut)
+
+    # --- PDF EXPORT BUTTON ---
+    st.markdown("---")
+    render_pdf_export(ds.version, latest_date, kpi_data, figs, chart_data)
+
+# --- HELPER FUNCTIONS ---
+
+def format_cut_date(fecha):
+    return fecha.strftime('%d-%m-%Y')
+
+def render_cut_charts(cuts, categoria, build):
+    """
+    Draw build(cut) for every cut, side by side when comparing
+
+    Returns the figure of the first (selected) cut, or None if it has no
+    rows of the categoria.
+    """
+    first = None
+    columns = st.columns(len(cuts)) if len(cuts) > 1 else [st.container()]
+    for i, (col, c) in enumerate(zip(columns, cuts)):
+        with col:
+            if len(cuts) > 1:
+                st.caption(f"Corte {format_cut_date(c.fecha)}")
+            if not c.has(categoria):
+                st.caption("Sin inventario")
+                continue
+            fig = build(c)
+            st.plotly_chart(fig, use_container_width=True, key=f"cliente_{categoria}_{i}")
+            if i == 0:
+                first = fig
+    return first
+
+# Rows of the comparison table: (insumo, categoria, estado_norm codes)
+COMPARISON_ROWS = [
+    ("ESTIBAS", 'estiba', ['disponible', 'reparar', 'clasificar']),
+    ("CARPAS", 'carpa', ['disponible', 'reparar', 'clasificar']),
+    ("PLÁSTICOS", 'plastico', ['disponible', 'reparar', 'clasificar']),
+]
+STATE_LABELS = {'disponible': 'Disponible', 'reparar': 'Por Reparar', 'clasificar': 'Por Clasificar'}
+
+def render_cut_comparison(cut_a, cut_b):
+    """KPIs of two cuts side by side, with the change from cut_b to cut_a"""
+    label_a, label_b = format_cut_date(cut_a.fecha), format_cut_date(cut_b.fecha)
+    rows = []
+    for title, categoria, codes in COMPARISON_ROWS:
+        for code in codes:
+            a, b = cut_a.estado(categoria, code), cut_b.estado(categoria, code)
+            if a or b:
+                rows.append((title, STATE_LABELS[code], a, b))
+    a, b = cut_a.total('espacio'), cut_b.total('espacio')
+    if a or b:
+        rows.append(("ESPACIOS", "Total", a, b))
+
+    if not rows:
+        st.caption("Sin inventario")
+        return
+    df = pd.DataFrame(rows, columns=['Insumo', 'Estado', label_a, label_b])
+    df[[label_a, label_b]] = df[[label_a, label_b]].astype('int64')
+    df['Variación'] = df[label_a] - df[label_b]
+    st.dataframe(df, hide_index=True, use_container_width=True)
+
+def build_report_data(cut):
+    """
+    KPI values and chart rows of the PDF report for one cube cut
+
+    Pure data (no Streamlit calls), shared with the batch generator
+    (src.batch_reports).
+
+    Returns:
+        tuple: (kpi_data, chart_data) as taken by generate_pdf_report
+    """
     # Helper to sum up states
-    def sum_state(d, s): 
-        # Flexible match
-        return d[d['estado'].astype(str).str.contains(s, case=False, na=False)]['cantidad'].sum() if not d.empty else 0
+    def sum_state(c, s): 
+        # c is a categoria code, s an estado_norm code: disponible / reparar / clasificar
+        return cut.estado(c, s)
 
     kpi_data = {
         'estibas': {
-            'disponible': sum_state(df_estibas, 'disponible'),
-            'reparar': sum_state(df_estibas, 'reparar'),
-            'clasificar': sum_state(df_estibas, 'clasificar')
+            'disponible': sum_state('estiba', 'disponible'),
+            'reparar': sum_state('estiba', 'reparar'),
+            'clasificar': sum_state('estiba', 'clasificar')
         },
         'carpas': {
-            'disponible': sum_state(df_carpas, 'disponible'),
-            'reparar': sum_state(df_carpas, 'reparar'),
-            'clasificar': sum_state(df_carpas, 'clasificar')
+            'disponible': sum_state('carpa', 'disponible'),
+            'reparar': sum_state('carpa', 'reparar'),
+            'clasificar': sum_state('carpa', 'clasificar')
         },
         'plasticos': {
-            'disponible': sum_state(df_plasticos, 'disponible'),
-            'reparar': sum_state(df_plasticos, 'reparar')
+            'disponible': sum_state('plastico', 'disponible'),
+            'reparar': sum_state('plastico', 'reparar')
         },
         'espacios': {
-            'total': df_espacios['cantidad'].sum() if not df_espacios.empty else 0,
+            'total': cut.total('espacio'),
             'sizes': {}
         }
     }
     
-    if not df_espacios.empty:
-       brk = 'subtipo_insumo' if 'subtipo_insumo' in df_espacios.columns else 'insumo'
-       for k, v in df_espacios.groupby(brk)['cantidad'].sum().sort_values(ascending=False).items():
-           if v > 0: kpi_data['espacios']['sizes'][k] = v
+    for k, v in cut.by_subtipo('espacio').items():
+        if v > 0: kpi_data['espacios']['sizes'][k] = v
+
+    # Rows behind each chart, so the PDF can draw them as vectors
+    chart_data = {
+        'estibas': cut.rows('subzona', 'estiba') if cut.has('estiba') else None,
+        'carpas': cut.rows('subzona', 'carpa') if cut.has('carpa') else None,
+        'plasticos': cut.rows('subzona', 'plastico') if cut.has('plastico') else None,
+        'espacios': cut.rows('espacios', 'espacio') if cut.has('espacio') else None,
+    }
+    return kpi_data, chart_data
 
+def build_report_figures(chart_data):
+    """Plotly figures of the report charts, without rendering them in the page"""
+    figs = {}
+    for name in ('estibas', 'carpas', 'plasticos'):
+        rows = chart_data.get(name)
+        figs[name] = _build_subzone_grouped_chart(rows) if rows is not None else None
+    rows = chart_data.get('espacios')
+    figs['espacios'] = _build_espacios_chart(rows) if rows is not None else None
+    return figs
 
+def render_pdf_export(version, fecha, kpi_data, figs, chart_data=None):
+    """
+    "Descargar Reporte PDF": charts drawn as vectors (or rasterized in
+    parallel with kaleido, see config.PDF_CHART_RENDERER), PDF built in memory
 
-    # --- PDF/HTML EXPORT BUTTON ---
-    st.markdown("---")
-    
+    The bytes are kept in the session for the (dataset version, cut) they were
+    generated for, so the download button survives the rerun it triggers.
+    """
     try:
-        from src.pdf_report import build_pdf_html
-        import base64
-        import plotly.io as pio
-        
-        # Set default renderer to use kaleido
-        pio.renderers.default = "png"
-        
-        # if st.button("📥 Descargar Reporte PDF Ejecutivo"):
-        #     with st.spinner("Generando reporte..."):
-        #         try:
-        #             # Prepare KPI data for PDF
-        #             pdf_kpis = {
-        #                 "ESTIBAS": {
-        #                     "Disponibles": int(kpi_data['estibas']['disponible']),
-        #                     "Reparar": int(kpi_data['estibas']['reparar']),
-        #                     "Clasificar": int(kpi_data['estibas']['clasificar'])
-        #                 },
-        #                 "CARPAS": {
-        #                     "Disponibles": int(kpi_data['carpas']['disponible']),
-        #                     "Reparar": int(kpi_data['carpas']['reparar']),
-        #                     "Clasificar": int(kpi_data['carpas']['clasificar'])
-        #                 },
-        #                 "PLÁSTICOS": {
-        #                     "Disponibles": int(kpi_data['plasticos']['disponible']),
-        #                     "Reparar": int(kpi_data['plasticos']['reparar'])
-        #                 },
-        #                 "ESPACIOS": {
-        #                     "Total": int(kpi_data['espacios']['total']),
-        #                     **{f"{k}": int(v) for k, v in list(kpi_data['espacios']['sizes'].items())[:3]}
-        #                 }
-        #             }
-        #             
-        #             # Convert Plotly figures to static images (base64) using Kaleido
-        #             charts_html = ""
-        #             for fig_name, fig in [('estibas', figs['estibas']), 
-        #                                  ('carpas', figs['carpas']),
-        #                                  ('plasticos', figs['plasticos']),
-        #                                  ('espacios', figs['espacios'])]:
-        #                 if fig is not None:
-        #                     # Convert to static image using kaleido explicitly
-        #                     img_bytes = fig.to_image(
-        #                         format="png", 
-        #                         engine="kaleido",
-        #                         width=600, 
-        #                         height=300, 
-        #                         scale=2
-        #                     )
-        #                     img_b64 = base64.b64encode(img_bytes).decode()
-        #                     charts_html += f'<div class="chart"><img src="data:image/png;base64,{img_b64}"></div>'
-        #             
-        #             # Generate HTML
-        #             html = build_pdf_html(
-        #                 fecha=latest_date.strftime("%d-%m-%Y"),
-        #                 kpis=pdf_kpis,
-        #                 charts_html=charts_html
-        #             )
-        #             
-        #             # Download as HTML file (user can print to PDF from browser)
-        #             st.download_button(
-        #                 label="⬇️ Guardar Reporte HTML",
-        #                 data=html.encode('utf-8'),
-        #                 file_name=f"SIPOR_Balance_{latest_date.strftime('%Y%m%d')}.html",
-        #                 mime="text/html"
-        #             )
-        #             
-        #             st.success("✅ Reporte generado! Abre el archivo HTML y usa Ctrl+P → Guardar como PDF")
-        #             st.info("""
-        #             📄 **Cómo convertir a PDF:**
-        #             1. Abre el archivo HTML descargado
-        #             2. Presiona Ctrl+P (Cmd+P en Mac)  
-        #             3. Selecciona "Guardar como PDF"
-        #             4. Guarda el PDF
-        #             """)
-        #         
-        #         except Exception as e:
-        #             st.error(f"Error al generar reporte: {str(e)}")
-        #         
-    except ImportError as e:
-        # st.warning("Kaleido no está instalado")
-        pass
+        from src.pdf_generator import generate_pdf_report
+    except ImportError:
+        st.caption("Exportación PDF no disponible: instala fpdf2")
+        return
 
-# --- HELPER FUNCTIONS ---
+    key = (version, fecha)
+    if st.button("📥 Descargar Reporte PDF"):
+        with st.spinner("Generando reporte..."):
+            try:
+                start = time.perf_counter()
+                pdf_bytes = generate_pdf_report(format_cut_date(fecha), kpi_data, figs, chart_data)
+                st.session_state['cliente_pdf'] = (key, pdf_bytes, time.perf_counter() - start)
+            except Exception as e:
+                st.error(f"Error al generar reporte: {str(e)}")
+
+    report = st.session_state.get('cliente_pdf')
+    if report is not None and report[0] == key:
+        _, pdf_bytes, seconds = report
+        st.download_button(
+            label="⬇️ Guardar Reporte PDF",
+            data=pdf_bytes,
+            file_name=f"SIPOR_Balance_{fecha.strftime('%Y%m%d')}.pdf",
+            mime="application/pdf"
+        )
+        st.caption(f"Reporte generado en {seconds:.2f} s")
+
+# KPI labels -> estado_norm codes
+FOCUS_STATE_CODES = {'Disponible': 'disponible', 'Por Reparar': 'reparar'}
 
-def render_kpi_group(title, df, focus_states):
+def render_kpi_group(title, cut, categoria, focus_states):
     st.markdown(f"**{title}**")
-    if df.empty:
+    if not cut.has(categoria):
         st.caption("-")
         return
         
-    df_st = df.groupby('estado')['cantidad'].sum().reset_index()
+    # One value per estado_norm code (disponible / reparar / clasificar)
+    df_st = cut.by_estado(categoria)
     
-    def get_val(term):
-        match = df_st[df_st['estado'].astype(str).str.contains(term, case=False, na=False)]
-        return match['cantidad'].sum() if not match.empty else 0
+    def get_val(code):
+        return df_st.get(code, 0)
     
     # Render metrics
     has_val = False
     for state in focus_states:
-        val = get_val(state)
-        # Map fuzzy terms
-        if 'Reparar' in state: val = get_val('reparar')
-        if 'Disponible' in state: val = get_val('disponible')
+        # Map display labels to estado_norm codes
+        val = get_val(FOCUS_STATE_CODES.get(state, state))
         
         if val > 0:
             st.metric(state, f"{int(val):,}")
@@ -269,18 +333,17 @@ def render_kpi_group(title, df, focus_states):
     if not has_val:
         st.caption("Sin inventario")
 
-def render_espacios_kpi(df):
+def render_espacios_kpi(cut):
     st.markdown("**ESPACIOS**")
-    if df.empty:
+    if not cut.has('espacio'):
         st.caption("-")
         return
     
-    total = df['cantidad'].sum()
+    total = cut.total('espacio')
     if total > 0:
         st.metric("Total", f"{int(total):,}")
         
-        breakdown_col = 'subtipo_insumo' if 'subtipo_insumo' in df.columns else 'insumo'
-        sizes = df.groupby(breakdown_col)['cantidad'].sum().sort_values(ascending=False)
+        sizes = cut.by_subtipo('espacio')
         
         txt = []
         for s, v in sizes.items():
@@ -291,49 +354,28 @@ def render_espacios_kpi(df):
     else:
         st.caption("Sin espacios")
 
-def get_location_type(zona_name):
-    """Normalize and categorize based on ZONA column only"""
-    s = str(zona_name).strip().upper()
-    if 'PATIO' in s: return 'Patios'
-    if 'BODEGA' in s: return 'Bodegas'
-    return 'Patios' # Fallback for safety or exclude? User said "Otros" must not exist. 
-    # If data has bad zones, we might prefer "Otros" but user forbids it.
-    # Let's map anything else to Patios or Bodegas if possible, or filtered out in chart.
-
-def get_location_color(loc_type):
-    if loc_type == 'Patios': return COLORS['yellow']
-    if loc_type == 'Bodegas': return COLORS['gray']
-    return COLORS['yellow'] # Default to yellow if unsure to avoid "Blue/Otros"
-
-def render_subzone_grouped_chart(df, insumo_label):
-    fig = create_subzone_grouped_chart(df, insumo_label)
+def render_subzone_grouped_chart(df, insumo_label, version=None):
+    fig = create_subzone_grouped_chart(df, insumo_label, version)
     st.plotly_chart(fig, use_container_width=True)
 
-def create_subzone_grouped_chart(df, insumo_label):
+def create_subzone_grouped_chart(df_viz, insumo_label, version=None):
+    """df_viz: cube rows with cantidad per (zona, ubicacion, subzona), sorted by zona, subzona"""
     st.markdown(f"#### Distribución de {insumo_label} por Subzona")
-    
-    # Group by Zona AND Subzone to get correct location type from Zona
-    df_viz = df.groupby(['zona', 'subzona'])['cantidad'].sum().reset_index().sort_values(['zona', 'subzona'])
-    
-    # Add Location Type for Coloring using ZONA
-    df_viz['Ubicación'] = df_viz['zona'].apply(get_location_type)
-    
-    # Map colors
-    color_map = {
-        'Patios': COLORS['yellow'],
-        'Bodegas': COLORS['gray'],
-        'Bodegas': COLORS['gray'] # Duplicate key safety
-    }
-    
+    # Reruns with the same rows reuse the built figure (see src.figure_cache)
+    return cached_figure(version, 'subzone_grouped', df_viz, lambda: _build_subzone_grouped_chart(df_viz))
+
+def _build_subzone_grouped_chart(df_viz):
+    # Colored by the ubicacion code the loader derived from ZONA (LOCATION_COLORS)
     fig = px.bar(
         df_viz, 
         x='subzona', 
         y='cantidad', 
-        color='Ubicación',
+        color='ubicacion',
         text='cantidad',
         title="",
-        color_discrete_map=color_map,
-        category_orders={"Ubicación": ["Patios", "Bodegas"]}
+        labels={'ubicacion': "Ubicación"},
+        color_discrete_map=LOCATION_COLORS,
+        category_orders={'ubicacion': list(LOCATION_COLORS)}
     )
     
     fig.update_traces(texttemplate='%{text:,.0f}', textposition='outside')
@@ -353,30 +395,27 @@ def create_subzone_grouped_chart(df, insumo_label):
     )
     return fig
 
-def render_espacios_chart(df):
+def render_espacios_chart(cut, version=None):
     
     # 0. STRICT FILTER: Only Available > 0
-    df = df[df['cantidad'] > 0]
-    df = df[df['estado'].astype(str).str.contains("disponible", case=False, na=False)]
+    df = cut.rows('espacios_estado', 'espacio')
+    df = df[(df['cantidad'] > 0).to_numpy() & eq_mask(df['estado_norm'], 'disponible')]
     
     if df.empty:
         st.info("No hay espacios disponibles.")
         return
 
-    fig = create_espacios_chart(df)
+    fig = create_espacios_chart(df, version)
     st.plotly_chart(fig, use_container_width=True)
 
-def create_espacios_chart(df):
-    breakdown_col = 'subtipo_insumo' if 'subtipo_insumo' in df.columns else 'insumo'
-    
-    # 1. Group Data (Strictly Subzona + Size)
-    # Removing Zona from groupby to avoid fragmentation
-    df_viz = df.groupby(['subzona', breakdown_col])['cantidad'].sum().reset_index()
-    
-    # 2. Sort
-    df_viz = df_viz.sort_values(['subzona'])
+def create_espacios_chart(df_viz, version=None):
+    """df_viz: cube rows with cantidad per (subzona, size), sorted by subzona"""
+    return cached_figure(version, 'espacios', df_viz, lambda: _build_espacios_chart(df_viz))
+
+def _build_espacios_chart(df_viz):
+    breakdown_col = 'subtipo_insumo' if 'subtipo_insumo' in df_viz.columns else 'insumo'
 
-    # 3. Create Chart
+    # Create Chart
     # X=Subzona, Y=Qty, Color=Size
     fig = px.bar(
         df_viz, 
@@ -0,0 +1,42 @@
+"""
+SIPOR Dashboard - Configuration
+Runtime settings, overridable through environment variables
+"""
+
+import json
+import os
+
+# Excel reader used for Base_Operacion:
+#   'stream'   -> src.xlsx_reader, parses only the Base_Operacion sheet XML
+#   'openpyxl' -> pandas.read_excel, opens the whole workbook
+EXCEL_READER = os.environ.get('SIPOR_EXCEL_READER', 'stream')
+
+# Seconds between background checks of the workbook for a new version
+RELOAD_POLL_SECONDS = float(os.environ.get('SIPOR_RELOAD_POLL_SECONDS', '2'))
+
+# Storage backend serving the loader queries:
+#   'pandas' -> in-memory partitions (src.dataset)
+#   'sqlite' -> indexed SQLite database next to the workbook (src.sqlite_store)
+STORAGE_BACKEND = os.environ.get('SIPOR_BACKEND', 'pandas')
+
+# Ubicación of zonas whose name contains neither 'patio' nor 'bodega', as JSON
+# {"zona": "Patios" | "Bodegas"}; zonas and ubicaciones are matched
+# case-insensitively (unknown ubicaciones are rejected when src.dataset is
+# imported). Unlisted zonas fall back to DEFAULT_UBICACION.
+# E.g. SIPOR_ZONA_UBICACION='{"Muelle 2": "Bodegas"}'
+ZONA_UBICACION = json.loads(os.environ.get('SIPOR_ZONA_UBICACION', '{}'))
+DEFAULT_UBICACION = os.environ.get('SIPOR_DEFAULT_UBICACION', 'Patios')
+
+# Disk cache of rendered chart images (PDF reports), shared by every process;
+# least recently used images are evicted past IMAGE_CACHE_MB (0 disables it)
+IMAGE_CACHE_DIR = os.environ.get('SIPOR_IMAGE_CACHE_DIR', os.path.join('.sipor_cache', 'charts'))
+IMAGE_CACHE_MB = float(os.environ.get('SIPOR_IMAGE_CACHE_MB', '64'))
+
+# Chart drawing in the PDF report:
+#   'vector'  -> native FPDF bars from the aggregated rows (src.pdf_charts)
+#   'kaleido' -> Plotly figures rasterized to PNG (needs kaleido + Chrome)
+PDF_CHART_RENDERER = os.environ.get('SIPOR_PDF_CHARTS', 'vector')
+
+# Points drawn per series of the Dirección event trend; longer series are
+# reduced server-side (LTTB) and drawn with WebGL (0 disables the reduction)
+TREND_MAX_POINTS = int(os.environ.get('SIPOR_TREND_MAX_POINTS', '400'))
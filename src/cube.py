@@ -0,0 +1,167 @@
+"""
+SIPOR Dashboard - KPI Cube
+Inventory sums pre-aggregated per cut date, built once per dataset version
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import DateIndex, codes_for, unify_categories
+
+# Finest grain kept by the cube (besides fecha)
+CUBE_DIMENSIONS = ['categoria', 'estado_norm', 'zona', 'ubicacion', 'subzona', 'subtipo_insumo']
+
+# Rollups answering the Cliente queries: name -> grouping below fecha.
+# Rows with a missing key are dropped, as the view's group-bys did.
+ROLLUPS = {
+    'total': ['categoria'],
+    'estado': ['categoria', 'estado_norm'],
+    'subzona': ['categoria', 'zona', 'ubicacion', 'subzona'],
+    'espacios': ['categoria', 'subzona', 'subtipo_insumo'],
+    'espacios_estado': ['categoria', 'estado_norm', 'subzona', 'subtipo_insumo'],
+    'subtipo': ['categoria', 'subtipo_insumo'],
+}
+
+AGGREGATE_NAME = 'kpi_cube'
+
+
+def _rollup(frame, keys, dropna):
+    return (
+        frame.groupby(['fecha'] + keys, observed=True, dropna=dropna, sort=True)['cantidad']
+        .sum()
+        .reset_index()
+    )
+
+
+def _breakdown(inventario):
+    """Espacios size column (subtipo_insumo, or insumo on older sheets)"""
+    return 'subtipo_insumo' if 'subtipo_insumo' in inventario.columns else 'insumo'
+
+
+def _build_tables(inventario):
+    """Base table and rollups of an inventory partition (or a date slice of it)"""
+    breakdown = _breakdown(inventario)
+    dims = [breakdown if c == 'subtipo_insumo' else c for c in CUBE_DIMENSIONS]
+    dims = [c for c in dims if c in inventario.columns]
+
+    # The base keeps rows with missing keys so totals include them
+    base = _rollup(inventario, dims, dropna=False)
+    tables = {'base': base}
+    for name, keys in ROLLUPS.items():
+        keys = [breakdown if c == 'subtipo_insumo' else c for c in keys]
+        tables[name] = _rollup(base, [c for c in keys if c in dims], dropna=True)
+    return tables
+
+
+class CubeCut:
+    """All Cliente answers for one cut date (slices of the cube, no aggregation)"""
+
+    def __init__(self, cube, fecha):
+        self.cube = cube
+        self.fecha = fecha
+
+    def rows(self, name, categoria):
+        """Rollup rows of a categoria at this cut (keys + cantidad)"""
+        return self.cube.rows(name, self.fecha, categoria)
+
+    def has(self, categoria):
+        return len(self.rows('total', categoria)) > 0
+
+    def total(self, categoria):
+        rows = self.rows('total', categoria)
+        return rows['cantidad'].iloc[0] if len(rows) else 0
+
+    def by_estado(self, categoria):
+        """Series estado_norm code -> cantidad"""
+        rows = self.rows('estado', categoria)
+        return pd.Series(rows['cantidad'].to_numpy(), index=rows['estado_norm'].astype(str).to_numpy())
+
+    def estado(self, categoria, code):
+        return self.by_estado(categoria).get(code, 0)
+
+    def by_subtipo(self, categoria):
+        """Series subtipo_insumo -> cantidad, largest first"""
+        rows = self.rows('subtipo', categoria)
+        labels = rows[self.cube.breakdown].astype(str).to_numpy()
+        series = pd.Series(rows['cantidad'].to_numpy(), index=labels)
+        return series.sort_values(ascending=False)
+
+
+class KpiCube:
+    """
+    Sums of cantidad per (fecha, categoria, estado_norm, zona, ubicacion,
+    subzona, subtipo_insumo) plus the rollups in ROLLUPS, for every cut date
+
+    Each table is sorted by fecha then by its keys and carries a DateIndex,
+    so a cut resolves to a positional slice and a categoria to a binary
+    search inside it: the cost of a query depends on the number of
+    aggregated rows of that cut, never on the raw row count.
+    """
+
+    def __init__(self, tables, breakdown='subtipo_insumo'):
+        self.tables = tables
+        self.breakdown = breakdown
+        self.date_index = {
+            name: DateIndex.from_sorted(table['fecha']) if len(table) else None
+            for name, table in tables.items()
+        }
+
+    @classmethod
+    def from_partition(cls, inventario):
+        if inventario.empty or 'categoria' not in inventario.columns:
+            return cls({})
+        return cls(_build_tables(inventario), _breakdown(inventario))
+
+    @property
+    def dates(self):
+        """Distinct cut dates, ascending"""
+        index = self.date_index.get('base')
+        return index.days if index is not None else np.array([], dtype='datetime64[s]')
+
+    def cut(self, fecha):
+        return CubeCut(self, fecha)
+
+    def rows(self, name, fecha, categoria):
+        table = self.tables.get(name)
+        index = self.date_index.get(name)
+        if table is None or index is None:
+            keys = [self.breakdown if c == 'subtipo_insumo' else c for c in ROLLUPS.get(name, [])]
+            return pd.DataFrame(columns=['fecha'] + keys + ['cantidad'])
+        lo, hi = index.day_bounds(fecha)
+        codes = codes_for(table['categoria'], [categoria])
+        if codes.size == 0:
+            return table.iloc[0:0]
+        # Inside one cut the rows are sorted by categoria code
+        day_codes = table['categoria'].cat.codes.to_numpy()[lo:hi]
+        start = lo + int(np.searchsorted(day_codes, codes[0], 'left'))
+        stop = lo + int(np.searchsorted(day_codes, codes[0], 'right'))
+        return table.iloc[start:stop]
+
+    def extend(self, ds, since):
+        """
+        Cube of `ds` after rows were appended (see src.dataset.append_rows)
+
+        Only the cuts on or after the earliest appended inventory date are
+        re-aggregated; earlier cuts are kept as they are.
+        """
+        start = since.get('inventario')
+        if start is None:
+            return self
+        fresh = _build_tables(ds.between('inventario', start, None)) if ds.row_count('inventario') else {}
+        if not self.tables or not fresh:
+            return KpiCube.from_partition(ds.partition('inventario'))
+
+        cutoff = np.datetime64(pd.Timestamp(start), 's')
+        tables = {}
+        for name, table in self.tables.items():
+            index = self.date_index[name]
+            if index is not None:
+                table = table.iloc[:int(index.offsets[np.searchsorted(index.days, cutoff, 'left')])]
+            categorical = [c for c in table.columns if isinstance(table[c].dtype, pd.CategoricalDtype)]
+            tables[name] = pd.concat(unify_categories([table, fresh[name]], categorical), ignore_index=True)
+        return KpiCube(tables, self.breakdown)
+
+
+def get_kpi_cube(ds):
+    """The KpiCube of a dataset version (built on first use, then reused)"""
+    return ds.aggregate(AGGREGATE_NAME, lambda d: KpiCube.from_partition(d.partition('inventario')))
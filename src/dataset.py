@@ -0,0 +1,484 @@
+"""
+SIPOR Dashboard - Dataset
+Parse-once, partitioned representation of Base_Operacion
+"""
+
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src import config
+
+# Partitions are handed out as zero-copy slices; copy-on-write (always on
+# from pandas 3, pinned in requirements.txt) guarantees a caller mutating its
+# frame never touches the cached one.
+
+# Critical columns per partition
+INVENTARIO_REQUIRED = ['fecha', 'zona', 'subzona', 'insumo', 'cantidad', 'estado']
+EVENTOS_REQUIRED = ['fecha', 'zona', 'insumo', 'cantidad', 'tipo_evento', 'turno']
+
+# Name of the sorted DatetimeIndex carried by the partitions (mirrors the 'fecha'
+# column; a distinct name keeps groupby('fecha') unambiguous)
+FECHA_INDEX = '_fecha'
+
+# Low-cardinality text columns stored as categoricals (int codes + one shared dictionary)
+DIMENSION_COLUMNS = [
+    'zona', 'subzona', 'insumo', 'subtipo_insumo',
+    'estado', 'tipo_evento', 'turno', 'tipo_registro',
+]
+
+# Derived codes: label -> case-insensitive pattern, the first match wins
+CATEGORIAS = {
+    'estiba': 'estiba',
+    'carpa': 'carpa',
+    'plastico': 'plastico|plástico',
+    'espacio': 'espacio',
+}
+ESTADOS_NORM = {
+    'disponible': 'disponible',
+    'reparar': 'reparar',
+    'clasificar': 'clasificar',
+}
+UBICACIONES = {
+    'Patios': 'patio',
+    'Bodegas': 'bodega',
+}
+
+
+def _ubicacion_label(value, setting):
+    """UBICACIONES label matching a configured value (case-insensitive), or ValueError"""
+    labels = {label.lower(): label for label in UBICACIONES}
+    label = labels.get(str(value).strip().lower())
+    if label is None:
+        raise ValueError(
+            f"{setting}: ubicación desconocida {value!r}; valores válidos: {', '.join(UBICACIONES)}"
+        )
+    return label
+
+
+def _ubicacion_fallback():
+    """(zona table, default) of config, with values checked against UBICACIONES"""
+    table = {
+        zona: _ubicacion_label(value, f"SIPOR_ZONA_UBICACION[{zona!r}]")
+        for zona, value in config.ZONA_UBICACION.items()
+    }
+    return table, _ubicacion_label(config.DEFAULT_UBICACION, "SIPOR_DEFAULT_UBICACION")
+
+
+# Derived column -> (source column, patterns, (fallback table, default) or None);
+# added by encode_dimensions. Zonas with neither keyword are resolved with
+# config.ZONA_UBICACION, then config.DEFAULT_UBICACION (there is no "Otros");
+# both are validated on import, so a bad setting fails at startup.
+DERIVED_COLUMNS = {
+    'categoria': ('insumo', CATEGORIAS, None),
+    'estado_norm': ('estado', ESTADOS_NORM, None),
+    'ubicacion': ('zona', UBICACIONES, _ubicacion_fallback()),
+}
+
+
+class DateIndex:
+    """
+    Per-day offsets into a partition sorted by fecha
+
+    Rows of day `days[i]` live in `[offsets[i], offsets[i + 1])`, so any date
+    range resolves to a positional slice with two binary searches over the
+    distinct days, and a single cut date with one dict lookup.
+    """
+
+    def __init__(self, days, offsets):
+        self.days = days
+        self.offsets = offsets
+        # Snapshot index: cut date (epoch seconds) -> position in days
+        self.positions = {day: i for i, day in enumerate(days.astype(np.int64).tolist())}
+
+    @classmethod
+    def from_sorted(cls, fechas):
+        values = fechas.to_numpy(dtype='datetime64[s]')
+        days, starts = np.unique(values, return_index=True)
+        return cls(days, np.append(starts, len(values)))
+
+    def bounds(self, start_date, end_date):
+        """Positional [start, stop) of the rows with start_date <= fecha <= end_date"""
+        lo = np.searchsorted(self.days, np.datetime64(pd.Timestamp(start_date), 's'), 'left')
+        hi = np.searchsorted(self.days, np.datetime64(pd.Timestamp(end_date), 's'), 'right')
+        return int(self.offsets[lo]), int(self.offsets[max(hi, lo)])
+
+    def day_bounds(self, day):
+        """Positional [start, stop) of the rows of a single cut date, O(1)"""
+        i = self.positions.get(int(np.datetime64(pd.Timestamp(day), 's').astype(np.int64)))
+        if i is None:
+            return self.bounds(day, day)  # not a cut date: empty slice
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+
+class Dataset:
+    """
+    Base_Operacion split once into its inventory (estado) and event (evento)
+    partitions, with all row-level normalization already applied.
+
+    Attributes:
+        raw: The whole sheet, dictionary-encoded (see encode_dimensions)
+        inventario: Rows with tipo_registro == 'estado'
+        eventos: Rows with tipo_registro == 'evento', tipo_evento title-cased
+        missing: {'inventario': [...], 'eventos': [...]} critical columns absent
+        date_index: {'inventario': DateIndex, 'eventos': DateIndex}
+        version: Workbook version token the data was built from (cache key)
+
+    Derived aggregates (e.g. the KPI cube) are memoized per Dataset through
+    aggregate(), i.e. built at most once per version.
+
+    Both partitions are sorted by fecha (rows without a date are dropped) and
+    indexed by a DatetimeIndex named FECHA_INDEX.
+    """
+
+    def __init__(self, raw, inventario, eventos, missing, version=None):
+        self.version = version
+        self.raw = raw
+        self.inventario = inventario
+        self.eventos = eventos
+        self.missing = missing
+        self.date_index = {
+            'inventario': DateIndex.from_sorted(inventario.index) if len(inventario) else None,
+            'eventos': DateIndex.from_sorted(eventos.index) if len(eventos) else None,
+        }
+        self._aggregates = {}
+        self._aggregate_lock = threading.Lock()
+
+    def aggregate(self, name, build):
+        """Derived aggregate `name`, built with build(self) on first use"""
+        with self._aggregate_lock:
+            if name not in self._aggregates:
+                self._aggregates[name] = build(self)
+            return self._aggregates[name]
+
+    # --- Query interface (mirrored by src.sqlite_store.SqliteDataset) ---
+
+    def partition(self, kind):
+        """Read-only view of the 'inventario' or 'eventos' partition"""
+        return getattr(self, kind).iloc[:]
+
+    def row_count(self, kind):
+        return len(getattr(self, kind))
+
+    def between(self, kind, start_date=None, end_date=None):
+        """Rows of a partition with start_date <= fecha <= end_date (zero-copy slice)"""
+        df = getattr(self, kind)
+        index = self.date_index[kind]
+        if index is None:
+            return df.iloc[:]
+        lo, hi = index.bounds(
+            index.days[0] if start_date is None else start_date,
+            index.days[-1] if end_date is None else end_date,
+        )
+        return df.iloc[lo:hi]
+
+    def snapshot(self, kind, fecha):
+        """Rows of a single cut date, located through the snapshot index"""
+        df = getattr(self, kind)
+        index = self.date_index[kind]
+        if index is None:
+            return df.iloc[:0]
+        lo, hi = index.day_bounds(fecha)
+        return df.iloc[lo:hi]
+
+    def date_range(self, kind):
+        """First and last fecha of a partition, or (None, None)"""
+        index = self.date_index[kind]
+        if index is None:
+            return None, None
+        return pd.Timestamp(index.days[0]), pd.Timestamp(index.days[-1])
+
+    def unique_values(self, kind, column, start_date=None, end_date=None):
+        """Sorted labels present in a column of a partition (optionally within dates)"""
+        df = self.between(kind, start_date, end_date)
+        if df.empty or column not in df.columns:
+            return []
+        return unique_labels(df[column])
+
+
+def _missing_columns(df, required):
+    return [col for col in required if col not in df.columns]
+
+
+def _normalize_categorical(series, func):
+    """
+    Apply a string normalization to the dictionary only, then re-map the codes
+
+    Categories that collapse to the same normalized value (e.g. 'Estado' and
+    'estado ') are merged into a single code.
+    """
+    cats = series.cat.categories
+    normalized = func(pd.Series(cats.astype(str), dtype=object))
+    new_cats = pd.Index(normalized.unique())
+    remap = np.append(new_cats.get_indexer(normalized), -1)
+    codes = remap[series.cat.codes.to_numpy()]  # code -1 (NaN) picks the appended -1
+    return pd.Series(pd.Categorical.from_codes(codes, categories=new_cats), index=series.index)
+
+
+def derive_code(series, patterns, fallback=None):
+    """
+    Categorical with the label of the first pattern each value matches
+
+    The patterns are evaluated on the source dictionary only (one regex per
+    distinct value) and the result is broadcast to the rows through a code
+    lookup table. Values matching nothing are looked up in the optional
+    `fallback` = (table, default), table keyed by the stripped, lower-cased
+    value; without a fallback they are left missing.
+    """
+    labels = list(patterns)
+    cats = series.cat.categories.astype(str)
+    lut = np.full(len(cats) + 1, -1, dtype=np.int8)  # last slot answers code -1 (NaN)
+    for code in reversed(range(len(labels))):
+        hits = np.asarray(cats.str.contains(patterns[labels[code]], case=False, regex=True), dtype=bool)
+        lut[:-1][hits] = code
+    if fallback is not None:
+        table, default = fallback
+        table = {k.strip().lower(): v for k, v in table.items()}
+        keys = cats.str.strip().str.lower()
+        for i in np.flatnonzero(lut[:-1] == -1):
+            label = table.get(keys[i], default)
+            if label is not None:
+                lut[i] = labels.index(label)
+    codes = lut[series.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=series.index)
+
+
+def derived_signature():
+    """JSON-able description of the derived-code rules (stored codes are stale if it changes)"""
+    return json.loads(json.dumps(DERIVED_COLUMNS))
+
+
+def _compact_quantity(series):
+    """int32 when every quantity is whole and fits, float32 otherwise"""
+    values = series.to_numpy(dtype=np.float64)
+    if np.all(np.mod(values, 1) == 0) and (values.size == 0 or np.abs(values).max() < 2**31):
+        return series.astype(np.int32)
+    return series.astype(np.float32)
+
+
+def encode_dimensions(raw):
+    """
+    Compact, dictionary-encoded copy of the raw frame
+
+    - Dimension columns become categoricals; since the partitions are cut from
+      this one frame they all share the same dictionaries.
+    - `cantidad` becomes int32 (or float32 if it has decimals).
+    - `fecha` is truncated to the day.
+    - `categoria` (from insumo), `estado_norm` (from estado) and `ubicacion`
+      (from zona) are added as categoricals with fixed dictionaries
+      (CATEGORIAS / ESTADOS_NORM / UBICACIONES), so views select and color on
+      integer codes instead of matching text.
+    """
+    df = raw.copy()
+    for col in DIMENSION_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    if 'tipo_registro' in df.columns:
+        df['tipo_registro'] = _normalize_categorical(
+            df['tipo_registro'], lambda s: s.str.strip().str.lower()
+        )
+    if 'tipo_evento' in df.columns:
+        df['tipo_evento'] = _normalize_categorical(
+            df['tipo_evento'], lambda s: s.str.strip().str.title()
+        )
+    if 'cantidad' in df.columns:
+        df['cantidad'] = _compact_quantity(df['cantidad'])
+    if 'fecha' in df.columns:
+        df['fecha'] = df['fecha'].dt.normalize().astype('datetime64[s]')
+    for col, (source, patterns, fallback) in DERIVED_COLUMNS.items():
+        if source in df.columns:
+            df[col] = derive_code(df[source], patterns, fallback)
+    return df
+
+
+def codes_for(series, values):
+    """Integer codes of `values` in a categorical column's dictionary (unknowns dropped)"""
+    idx = series.cat.categories.get_indexer(pd.Index(list(values)))
+    return idx[idx >= 0]
+
+
+def eq_mask(series, value):
+    """series == value, evaluated on integer codes"""
+    codes = codes_for(series, [value])
+    if codes.size == 0:
+        return np.zeros(len(series), dtype=bool)
+    return series.cat.codes.to_numpy() == codes[0]
+
+
+def _sort_by_fecha(df):
+    """Stable sort by fecha with a matching DatetimeIndex; undated rows are dropped"""
+    if 'fecha' not in df.columns:
+        return df
+    df = df[df['fecha'].notna().to_numpy()]
+    df = df.sort_values('fecha', kind='stable')
+    df.index = pd.DatetimeIndex(df['fecha'], name=FECHA_INDEX)
+    return df
+
+
+def unique_labels(series, na_label='N/A'):
+    """Sorted distinct values as strings, missing shown as `na_label`"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Only the codes actually present are looked up in the dictionary
+        codes = np.unique(series.cat.codes.to_numpy())
+        values = series.cat.categories[codes[codes >= 0]].astype(str).tolist()
+        if codes.size and codes[0] < 0:
+            values.append(na_label)
+        return sorted(set(values))
+
+    return sorted(series.astype(str).replace('nan', na_label).unique().tolist())
+
+
+def bytes_per_row(df):
+    """Deep memory footprint of a frame, per row"""
+    if len(df) == 0:
+        return 0.0
+    return df.memory_usage(deep=True, index=True).sum() / len(df)
+
+
+def build_dataset(raw, version=None):
+    """
+    Partition, normalize and encode the raw Base_Operacion frame
+
+    Args:
+        raw: DataFrame returned by the loader (lower-cased column names)
+        version: Workbook version token, kept on the Dataset
+
+    Returns:
+        Dataset
+    """
+    empty = pd.DataFrame()
+    if raw.empty or 'tipo_registro' not in raw.columns:
+        return Dataset(raw, empty, empty, {'inventario': [], 'eventos': []}, version)
+
+    # Record type and event type are normalized on the dictionaries, not per row
+    compact = encode_dimensions(raw)
+    tipo = compact['tipo_registro']
+
+    inventario = _sort_by_fecha(compact[eq_mask(tipo, 'estado')])
+    eventos = _sort_by_fecha(compact[eq_mask(tipo, 'evento')])
+
+    missing = {
+        'inventario': _missing_columns(inventario, INVENTARIO_REQUIRED),
+        'eventos': _missing_columns(eventos, EVENTOS_REQUIRED),
+    }
+
+    return Dataset(compact, inventario, eventos, missing, version)
+
+
+def unify_categories(frames, columns):
+    """
+    Give every categorical column of `frames` the sorted union of their
+    dictionaries, so they concatenate as categoricals (codes are remapped only
+    where the dictionary actually changes)
+    """
+    frames = list(frames)
+    for col in columns:
+        dtypes = [f[col].dtype for f in frames if col in f.columns]
+        if not all(isinstance(d, pd.CategoricalDtype) for d in dtypes):
+            continue
+        categories = dtypes[0].categories
+        for dtype in dtypes[1:]:
+            if not dtype.categories.equals(categories):
+                categories = categories.union(dtype.categories)
+        for i, frame in enumerate(frames):
+            if col in frame.columns and not frame[col].cat.categories.equals(categories):
+                frame = frame.copy()
+                frame[col] = frame[col].cat.set_categories(categories)
+                frames[i] = frame
+    return frames
+
+
+def _append_partition(old, new):
+    """Sorted partition + sorted new rows; re-sorted only if the new rows go back in time"""
+    if len(new) == 0:
+        return old
+    if len(old) == 0:
+        return new
+    merged = pd.concat([old, new])
+    if new.index[0] < old.index[-1]:
+        # Stable sort keeps old rows ahead of new ones on the same day, as a full build does
+        merged = _sort_by_fecha(merged)
+    return merged
+
+
+def append_rows(ds, delta, version=None):
+    """
+    Dataset with rows appended to the sheet added to `ds`
+
+    Only `delta` is normalized and encoded; it is then concatenated onto the
+    already encoded frame and partitions (dictionaries merged, partitions kept
+    sorted). The result equals build_dataset() over the whole sheet.
+
+    Args:
+        ds: Dataset built from the sheet before the rows were appended
+        delta: New raw rows, same columns as the loader output
+        version: Workbook version token of the result
+
+    Returns:
+        Dataset
+    """
+    source_columns = [c for c in ds.raw.columns if c not in DERIVED_COLUMNS]
+    if ds.raw.empty or 'tipo_registro' not in ds.raw.columns or list(delta.columns) != source_columns:
+        # Nothing to build on: encode_dimensions accepts the encoded rows as input
+        return build_dataset(pd.concat([ds.raw, delta], ignore_index=True), version)
+
+    new = encode_dimensions(delta)
+    categorical = [c for c in new.columns if isinstance(new[c].dtype, pd.CategoricalDtype)]
+    raw, new, inventario, eventos = unify_categories(
+        [ds.raw, new, ds.inventario, ds.eventos], categorical
+    )
+
+    compact = pd.concat([raw, new], ignore_index=True)
+    if 'cantidad' in compact.columns and raw['cantidad'].dtype != new['cantidad'].dtype:
+        compact['cantidad'] = _compact_quantity(compact['cantidad'])
+
+    tipo = new['tipo_registro']
+    parts = {}
+    since = {}
+    for kind, old, label in (('inventario', inventario, 'estado'), ('eventos', eventos, 'evento')):
+        rows = _sort_by_fecha(new[eq_mask(tipo, label)])
+        since[kind] = rows.index[0] if len(rows) else None
+        part = _append_partition(old, rows)
+        if 'cantidad' in part.columns and part['cantidad'].dtype != compact['cantidad'].dtype:
+            part = part.assign(cantidad=part['cantidad'].astype(compact['cantidad'].dtype))
+        parts[kind] = part
+
+    missing = {
+        'inventario': _missing_columns(parts['inventario'], INVENTARIO_REQUIRED),
+        'eventos': _missing_columns(parts['eventos'], EVENTOS_REQUIRED),
+    }
+    result = Dataset(compact, parts['inventario'], parts['eventos'], missing, version)
+    return carry_aggregates(ds, result, since)
+
+
+def appended_rows(ds, kind, start):
+    """
+    Rows of a partition with fecha >= start; with start None, an empty slice
+    that still carries the partition's dictionaries and dtypes
+    """
+    if start is None:
+        last = ds.date_range(kind)[1]
+        start = None if last is None else last + pd.Timedelta(days=1)
+        if start is None:
+            return ds.between(kind).iloc[:0]
+    return ds.between(kind, start, None)
+
+
+def carry_aggregates(previous, result, since):
+    """
+    Give `result` the aggregates of `previous` that know how to extend
+    themselves (value.extend(result, since)); the others are rebuilt on use
+
+    Args:
+        since: {'inventario': ..., 'eventos': ...} earliest appended fecha per
+            partition, None where no rows were added
+    """
+    with previous._aggregate_lock:
+        aggregates = dict(previous._aggregates)
+    for name, value in aggregates.items():
+        if hasattr(value, 'extend'):
+            result._aggregates[name] = value.extend(result, since)
+    return result
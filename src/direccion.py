@@ -9,8 +9,25 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import timedelta
 
+from src import config
 from src.styles import COLORS, show_header, create_metric_card, get_plotly_template
-from src.loader import load_inventario, load_eventos, validate_data_exists, get_date_range, filter_by_date_range, get_unique_values
+from src.loader import load_dataset, validate_partition, get_date_range
+from src.event_cube import get_event_prefix
+from src.inventory_delta import GRAINS, get_inventory_pivot
+from src.downsample import downsample_series
+
+# Analysis window choices: label -> days back from the latest event (None = custom range)
+WINDOW_OPTIONS = {
+    "Últimos 7 días": 7,
+    "Últimos 30 días": 30,
+    "Últimos 90 días": 90,
+    "Últimos 365 días": 365,
+    "Personalizado": None,
+}
+DEFAULT_WINDOW = "Últimos 30 días"
+
+# Movers shown per direction in "Variación de Stocks"
+TOP_N = 5
 
 def render_direccion_view():
     """Render the management/direction view dashboard"""
@@ -22,67 +39,82 @@ def render_direccion_view():
     )
     
     # Load data
-    df_eventos = load_eventos()
-    df_inventario = load_inventario()
+    # One Dataset for the whole rerun, so both partitions come from the same version
+    # Partitions are queried by name: only the rows of each window are fetched
+    ds = load_dataset()
     
-    if not validate_data_exists(df_eventos, "Eventos"):
+    if not validate_partition('eventos', "Eventos", ds):
         return
     
-    # --- Date Range Logic (Fixed 30 Days) ---
-    # User requested REMOVAL of date inputs. We will auto-select the last 30 days of available data.
-    min_date_evt, max_date_evt = get_date_range(df_eventos)
+    # --- Date Range Logic (Selectable Window) ---
+    # Every window is answered from the per-version daily prefix sums, so
+    # switching windows only reads the two boundary rows (no event scan)
+    min_date_evt, max_date_evt = get_date_range('eventos', ds=ds)
     
     if not max_date_evt:
         st.error("No hay fechas válidas en el registro de eventos")
         return
 
-    # Default to last 30 days from the latest event
-    end_date = max_date_evt
-    start_date = max_date_evt - timedelta(days=30)
+    # --- Sidebar Filters ---
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### 🔍 Filtros Operativos")
+    
+    periodo = st.sidebar.selectbox(
+        "Período", list(WINDOW_OPTIONS), index=list(WINDOW_OPTIONS).index(DEFAULT_WINDOW), key="dir_periodo"
+    )
+    days = WINDOW_OPTIONS[periodo]
+    if days is None:
+        picked = st.sidebar.date_input(
+            "Rango personalizado",
+            value=(max(min_date_evt, max_date_evt - timedelta(days=30)).date(), max_date_evt.date()),
+            min_value=min_date_evt.date(), max_value=max_date_evt.date(),
+            format="DD/MM/YYYY", key="dir_rango"
+        )
+        # While the range is being picked only its start is set
+        picked = picked if isinstance(picked, (list, tuple)) else (picked,)
+        start_date = pd.Timestamp(picked[0])
+        end_date = pd.Timestamp(picked[-1])
+    else:
+        # Last `days` days from the latest event
+        end_date = max_date_evt
+        start_date = max_date_evt - timedelta(days=days)
     
     # Ensure start date is not before the earliest available data
     if min_date_evt and start_date < min_date_evt:
         start_date = min_date_evt
 
-    st.info(f"📅 Analizando período: **{start_date.strftime('%d-%m-%Y')}** al **{end_date.strftime('%d-%m-%Y')}** (Últimos 30 días operables)")
+    st.info(f"📅 Analizando período: **{start_date.strftime('%d-%m-%Y')}** al **{end_date.strftime('%d-%m-%Y')}** ({periodo})")
 
-    # --- Sidebar Filters ---
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("### 🔍 Filtros Operativos")
-    
-    # Filter Events by the fixed date range
-    df_filtered_evt = filter_by_date_range(df_eventos, start_date, end_date)
+    # KPI windows: differences of the daily prefix sums per (tipo_evento, turno, zona);
+    # the turno / zona filters select groups, so no event row is scanned
+    prefix = get_event_prefix(ds)
+    period_window = prefix.window(start_date, end_date)
     
-    # Additional filters for Events
-    turnos = get_unique_values(df_filtered_evt, 'turno')
+    # Additional filters for Events (values present in the window)
+    turnos = period_window.labels('turno')
     selected_turnos = st.sidebar.multiselect("Turnos", options=turnos, default=turnos)
     
-    zonas = get_unique_values(df_filtered_evt, 'zona')
+    zonas = period_window.labels('zona')
     selected_zonas = st.sidebar.multiselect("Zonas", options=zonas, default=zonas, key="dir_zonas")
     
-    # Apply context filters
-    if selected_turnos:
-        df_filtered_evt = df_filtered_evt[df_filtered_evt['turno'].isin(selected_turnos)]
-    if selected_zonas:
-        df_filtered_evt = df_filtered_evt[df_filtered_evt['zona'].isin(selected_zonas)]
+    groups = prefix.group_mask(turno=selected_turnos, zona=selected_zonas)
+    window = prefix.window(start_date, end_date, groups)
 
-    if df_filtered_evt.empty:
+    if window.empty:
         st.warning("⚠️ No hay eventos para los filtros seleccionados en este período")
     
     # --- SECTION 1: EVENT ANALYSIS (Repairs / Write-offs) ---
     st.markdown("## 🛠️ Productividad y Eventos")
     
     # KPIs
-    total_reparadas = df_filtered_evt[df_filtered_evt['tipo_evento'] == 'Reparada']['cantidad'].sum()
-    total_bajas = df_filtered_evt[df_filtered_evt['tipo_evento'] == 'Baja']['cantidad'].sum()
+    total_reparadas = window.total('Reparada')
+    total_bajas = window.total('Baja')
     
-    # Trend Logic
+    # Trend Logic (same turno / zona filters on the previous window)
     period_days = (end_date - start_date).days
     prev_start = start_date - timedelta(days=period_days)
     prev_end = start_date - timedelta(days=1)
-    df_prev = filter_by_date_range(df_eventos, prev_start, prev_end)
-    
-    total_reparadas_prev = df_prev[df_prev['tipo_evento'] == 'Reparada']['cantidad'].sum()
+    total_reparadas_prev = prefix.window(prev_start, prev_end, groups).total('Reparada')
     
     delta_rep = None
     if total_reparadas_prev > 0:
@@ -96,7 +128,7 @@ def render_direccion_view():
         create_metric_card("Bajas", f"{int(total_bajas):,}")
     with col3:
         # Efficiency by shift
-        shift_sum = df_filtered_evt.groupby('turno', as_index=False)['cantidad'].sum()
+        shift_sum = window.sum_by('turno')
         if shift_sum.empty:
             best_shift = "N/A"
         else:
@@ -106,7 +138,7 @@ def render_direccion_view():
         
     with col4:
          # Efficiency by zone
-        zona_sum = df_filtered_evt.groupby('zona', as_index=False)['cantidad'].sum()
+        zona_sum = window.sum_by('zona')
         if zona_sum.empty:
             best_zone = "N/A"
         else:
@@ -121,18 +153,37 @@ def render_direccion_view():
     
     with col1:
         st.markdown("### Tendencia de Eventos")
-        df_time = df_filtered_evt.groupby(['fecha', 'tipo_evento'])['cantidad'].sum().reset_index()
+        df_time = window.daily('tipo_evento')
+        longest = df_time['tipo_evento'].value_counts().max() if not df_time.empty else 0
+        if config.TREND_MAX_POINTS > 0 and longest > config.TREND_MAX_POINTS:
+            # Long history: the chart shows a reduced view; narrowing the range
+            # re-reads the prefix sums, down to the full daily detail
+            first, last = df_time['fecha'].min().date(), df_time['fecha'].max().date()
+            zoom = st.slider(
+                "Ampliar rango", min_value=first, max_value=last, value=(first, last),
+                step=timedelta(days=1), format="DD/MM/YYYY", key="dir_tendencia_zoom"
+            )
+            if zoom != (first, last):
+                df_time = prefix.window(zoom[0], zoom[1], groups).daily('tipo_evento')
+        points = len(df_time)
+        df_time, reduced = downsample_series(df_time, 'fecha', 'cantidad', 'tipo_evento', config.TREND_MAX_POINTS)
         fig = px.line(
             df_time, x='fecha', y='cantidad', color='tipo_evento',
-            markers=True,
+            markers=not reduced,
+            render_mode='webgl' if reduced else 'auto',
             color_discrete_map={'Reparada': COLORS['success'], 'Baja': COLORS['danger']}
         )
         fig.update_layout(**get_plotly_template()['layout'])
         st.plotly_chart(fig, use_container_width=True)
+        if reduced:
+            st.caption(
+                f"Vista reducida: {len(df_time):,} de {points:,} puntos diarios. "
+                "Acota el rango para ver el detalle diario."
+            )
         
     with col2:
         st.markdown("### Productividad por Turno")
-        df_shift = df_filtered_evt.groupby(['turno', 'tipo_evento'])['cantidad'].sum().reset_index()
+        df_shift = window.sum_by('turno', 'tipo_evento')
         fig = px.bar(
             df_shift, x='turno', y='cantidad', color='tipo_evento',
             barmode='group',
@@ -142,39 +193,32 @@ def render_direccion_view():
         st.plotly_chart(fig, use_container_width=True)
 
     # --- SECTION 2: INVENTORY VARIATIONS (Deltas) ---
-    if not df_inventario.empty:
+    if ds.row_count('inventario') > 0 and not ds.missing['inventario']:
         st.markdown("## 📈 Variación de Stocks (Deltas)")
         
         # Calculate Delta: Value at End Date - Value at Start Date
-        # Filter dates strictly
-        df_inv_period = filter_by_date_range(df_inventario, start_date, end_date)
+        # First and last cuts of the window, read from the per-version
+        # (fecha x label) matrices: a delta is one row subtraction
+        pivot = get_inventory_pivot(ds)
+        actual_min_date, actual_max_date = pivot.cut_range(start_date, end_date)
         
-        if not df_inv_period.empty:
-            actual_min_date = df_inv_period['fecha'].min()
-            actual_max_date = df_inv_period['fecha'].max()
+        if actual_min_date is not None:
             
             if actual_min_date != actual_max_date:
-                # Group by Insumo (and Zone/Subzone if needed) for Start and End dates
-                # Using 'insumo' for broad overview
-                
-                df_start = df_inv_period[df_inv_period['fecha'] == actual_min_date].groupby('insumo')['cantidad'].sum()
-                df_end = df_inv_period[df_inv_period['fecha'] == actual_max_date].groupby('insumo')['cantidad'].sum()
-                
-                # Combine
-                df_deltas = pd.DataFrame({'Inicio': df_start, 'Fin': df_end}).fillna(0)
-                df_deltas['Delta'] = df_deltas['Fin'] - df_deltas['Inicio']
-                df_deltas['Delta %'] = (df_deltas['Delta'] / df_deltas['Inicio'] * 100).fillna(0)
-                df_deltas = df_deltas.reset_index()
+                # Grain of the comparison (insumo for the broad overview)
+                grain = st.selectbox(
+                    "Nivel de detalle", pivot.grains, format_func=GRAINS.get, key="dir_delta_grano"
+                )
                 
                 # Visualizing Deltas
                 col1, col2 = st.columns(2)
                 
                 with col1:
                     st.markdown(f"### Mayores Aumentos (vs {actual_min_date.strftime('%d-%m')})")
-                    df_incr = df_deltas[df_deltas['Delta'] > 0].sort_values('Delta', ascending=False).head(5)
+                    df_incr = pivot.top(grain, actual_min_date, actual_max_date, n=TOP_N, increases=True)
                     if not df_incr.empty:
                         fig = px.bar(
-                            df_incr, y='insumo', x='Delta', orientation='h',
+                            df_incr, y=grain, x='Delta', orientation='h',
                             text='Delta',
                             color_discrete_sequence=[COLORS['success']]
                         )
@@ -186,10 +230,10 @@ def render_direccion_view():
 
                 with col2:
                     st.markdown(f"### Mayores Disminuciones (vs {actual_min_date.strftime('%d-%m')})")
-                    df_decr = df_deltas[df_deltas['Delta'] < 0].sort_values('Delta', ascending=True).head(5)
+                    df_decr = pivot.top(grain, actual_min_date, actual_max_date, n=TOP_N, increases=False)
                     if not df_decr.empty:
                         fig = px.bar(
-                            df_decr, y='insumo', x='Delta', orientation='h',
+                            df_decr, y=grain, x='Delta', orientation='h',
                             text='Delta',
                             color_discrete_sequence=[COLORS['danger']]
                         )
@@ -0,0 +1,256 @@
+"""
+SIPOR Dashboard - Disk Cache
+Persistent columnar cache for the Base_Operacion sheet, keyed by workbook fingerprint
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (Parquet engine)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Bump when the cached frame layout changes so old caches are ignored
+CACHE_FORMAT = 2
+CACHE_DIR_NAME = '.sipor_cache'
+
+# Appended rows are stored as extra parquet parts; past this many they are
+# compacted back into a single file
+MAX_PARTS = 16
+
+
+def get_cache_dir(file_path):
+    """Cache folder living next to the workbook"""
+    folder = os.path.dirname(os.path.abspath(file_path))
+    return os.path.join(folder, CACHE_DIR_NAME)
+
+
+def get_cache_paths(file_path, sheet_name='Base_Operacion'):
+    """
+    Paths of the cached frame and its fingerprint sidecar
+
+    Returns:
+        tuple: (parquet_path, meta_path)
+    """
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    base = os.path.join(get_cache_dir(file_path), f"{stem}.{sheet_name.lower()}")
+    return base + '.parquet', base + '.json'
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def workbook_fingerprint(file_path):
+    """
+    Fingerprint of the workbook: size, mtime and content hash
+
+    Returns:
+        dict: {'size', 'mtime_ns', 'sha256'}
+    """
+    st_info = os.stat(file_path)
+    return {
+        'size': st_info.st_size,
+        'mtime_ns': st_info.st_mtime_ns,
+        'sha256': file_sha256(file_path),
+    }
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh)
+    os.replace(tmp_path, path)
+
+
+def _part_path(parquet_path, name):
+    return os.path.join(os.path.dirname(parquet_path), name)
+
+
+def _read_parts(parquet_path, meta):
+    """Base file followed by the appended parts, as one frame (None if any is missing)"""
+    try:
+        frames = [pd.read_parquet(parquet_path)]
+        frames += [pd.read_parquet(_part_path(parquet_path, name)) for name in meta.get('parts', [])]
+    except Exception:
+        return None
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def _remove_parts(parquet_path, keep=()):
+    """Delete appended parts of the cached frame not listed in `keep`"""
+    folder, base = os.path.split(parquet_path)
+    prefix = base[:-len('.parquet')] + '.part'
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(prefix) and name.endswith('.parquet') and name not in keep:
+            try:
+                os.unlink(os.path.join(folder, name))
+            except OSError:
+                pass
+
+
+def read_cache_meta(file_path, sheet_name='Base_Operacion'):
+    """Sidecar of the cached frame (fingerprint, parts, sheet state), or None"""
+    parquet_path, meta_path = get_cache_paths(file_path, sheet_name)
+    meta = _read_meta(meta_path)
+    if not meta or meta.get('format') != CACHE_FORMAT or not os.path.exists(parquet_path):
+        return None
+    return meta
+
+
+def read_stale_frame(file_path, sheet_name='Base_Operacion'):
+    """
+    Last cached frame, whether or not it still matches the workbook
+
+    Used as the base an incremental read appends to.
+
+    Returns:
+        tuple: (DataFrame, meta) or (None, None)
+    """
+    if not PARQUET_AVAILABLE:
+        return None, None
+    meta = read_cache_meta(file_path, sheet_name)
+    if meta is None:
+        return None, None
+    df = _read_parts(get_cache_paths(file_path, sheet_name)[0], meta)
+    return (df, meta) if df is not None else (None, None)
+
+
+def read_cached_frame(file_path, sheet_name='Base_Operacion'):
+    """
+    Return the cached frame if it still matches the workbook, else None
+
+    Size and mtime are checked first; the content hash is only computed
+    when the mtime moved but the size did not (e.g. a touched or re-saved
+    file), so an unchanged workbook costs a single stat call.
+    """
+    if not PARQUET_AVAILABLE:
+        return None
+
+    parquet_path, meta_path = get_cache_paths(file_path, sheet_name)
+    meta = read_cache_meta(file_path, sheet_name)
+    if meta is None:
+        return None
+
+    try:
+        st_info = os.stat(file_path)
+    except OSError:
+        return None
+
+    if st_info.st_size != meta.get('size'):
+        return None
+
+    if st_info.st_mtime_ns != meta.get('mtime_ns'):
+        if file_sha256(file_path) != meta.get('sha256'):
+            return None
+        # Same content, new mtime: refresh the sidecar so the next check is a stat only
+        meta['mtime_ns'] = st_info.st_mtime_ns
+        try:
+            _write_json_atomic(meta_path, meta)
+        except OSError:
+            pass
+
+    return _read_parts(parquet_path, meta)
+
+
+def write_cached_frame(file_path, df, fingerprint, sheet_name='Base_Operacion', sheet_state=None):
+    """
+    Persist the parsed frame next to the workbook
+
+    `fingerprint` must be taken *before* parsing, so a workbook modified
+    mid-parse is detected as stale on the next read. `sheet_state` (see
+    src.xlsx_reader.read_sheet_state) lets the next read parse only the rows
+    appended after this one. Failures are silent: the cache is an
+    optimization and the Excel path always remains.
+
+    Returns:
+        bool: True if the cache was written
+    """
+    if not PARQUET_AVAILABLE:
+        return False
+
+    parquet_path, meta_path = get_cache_paths(file_path, sheet_name)
+    tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+        # Invalidate first: a crash mid-write must never pair old meta with a new frame
+        if os.path.exists(meta_path):
+            os.unlink(meta_path)
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, parquet_path)
+        _remove_parts(parquet_path)
+        _write_json_atomic(meta_path, {
+            'format': CACHE_FORMAT, **fingerprint, 'parts': [], 'sheet_state': sheet_state,
+        })
+        return True
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return False
+
+
+def append_cached_frame(file_path, delta, fingerprint, sheet_state, sheet_name='Base_Operacion'):
+    """
+    Add appended rows to the cached frame as a new parquet part
+
+    Only `delta` is written; the parts are compacted into the base file once
+    there are more than MAX_PARTS of them.
+
+    Returns:
+        bool: True if the cache was updated
+    """
+    if not PARQUET_AVAILABLE:
+        return False
+
+    meta = read_cache_meta(file_path, sheet_name)
+    if meta is None:
+        return False
+    parquet_path, meta_path = get_cache_paths(file_path, sheet_name)
+
+    parts = list(meta.get('parts', []))
+    if len(parts) >= MAX_PARTS:
+        base = _read_parts(parquet_path, meta)
+        if base is None:
+            return False
+        return write_cached_frame(
+            file_path, pd.concat([base, delta], ignore_index=True), fingerprint, sheet_name, sheet_state
+        )
+
+    stem = os.path.basename(parquet_path)[:-len('.parquet')]
+    name = f"{stem}.part{fingerprint['sha256'][:16]}.parquet"
+    part_path = _part_path(parquet_path, name)
+    tmp_path = f"{part_path}.{os.getpid()}.tmp"
+    try:
+        os.unlink(meta_path)
+        delta.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, part_path)
+        _write_json_atomic(meta_path, {
+            'format': CACHE_FORMAT, **fingerprint, 'parts': parts + [name], 'sheet_state': sheet_state,
+        })
+        return True
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return False
@@ -0,0 +1,63 @@
+"""
+SIPOR Dashboard - Series Downsampling
+Largest-Triangle-Three-Buckets reduction of long time series before they are sent to the browser
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Positions of the `n_out` points LTTB keeps out of (x, y), sorted by x
+
+    The first and last points are always kept; every bucket in between
+    keeps the point forming the largest triangle with the previous kept
+    point and the next bucket's mean, so peaks and dips survive.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n - 2 inner points split in n_out - 2 buckets (bounds[i]:bounds[i + 1])
+    bounds = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        if i + 2 < len(bounds):
+            nlo, nhi = hi, bounds[i + 2]
+            cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_series(df, x, y, by, max_points):
+    """
+    `df` with every `by` series reduced to at most `max_points` rows (LTTB
+    over x -> y); series already short enough are kept whole
+
+    Returns:
+        tuple: (frame, reduced) with reduced True when any series was cut
+    """
+    if max_points <= 0 or df.empty:
+        return df, False
+    parts, reduced = [], False
+    for _, series in df.groupby(by, observed=True, sort=False):
+        if len(series) > max_points:
+            xs = series[x].to_numpy()
+            if np.issubdtype(xs.dtype, np.datetime64):
+                xs = xs.astype('datetime64[s]').astype(np.int64)
+            series = series.iloc[lttb_indices(xs, series[y].to_numpy(), max_points)]
+            reduced = True
+        parts.append(series)
+    if not reduced:
+        return df, False
+    return pd.concat(parts).sort_index(kind='stable').reset_index(drop=True), True
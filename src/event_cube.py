@@ -0,0 +1,300 @@
+"""
+SIPOR Dashboard - Event Prefix Sums
+Daily event totals per (tipo_evento, turno, zona) as cumulative sums, built once per dataset version
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import appended_rows, codes_for
+
+# Grain of the daily table (besides fecha)
+EVENT_KEYS = ['tipo_evento', 'turno', 'zona']
+
+AGGREGATE_NAME = 'event_prefix'
+
+# Windows (with their aggregates) kept per filter combination
+MAX_CACHED_WINDOWS = 128
+
+
+class EventWindow:
+    """Sums and row counts of every (tipo_evento, turno, zona) group over one date window"""
+
+    def __init__(self, prefix, sums, counts, rows=(0, 0), mask=None):
+        self.prefix = prefix
+        self.sums = sums
+        self.counts = counts
+        self.rows = rows  # prefix rows (lo, hi) of the window
+        self.mask = mask
+        self._sum_by = {}  # dims -> frame, filled on first use
+        self._daily = {}
+
+    @property
+    def empty(self):
+        return not self.counts.any()
+
+    def total(self, tipo_evento=None):
+        """cantidad of the window, optionally of one tipo_evento only"""
+        if tipo_evento is None:
+            return self.sums.sum()
+        codes = codes_for(self.prefix.dictionaries['tipo_evento'], [tipo_evento])
+        return self.sums[np.isin(self.prefix.group_codes['tipo_evento'], codes)].sum()
+
+    def labels(self, dim, na_label='N/A'):
+        """Sorted labels of `dim` present in the window (as src.dataset.unique_labels)"""
+        codes = np.unique(self.prefix.group_codes[dim][self.counts > 0])
+        values = self.prefix.dictionaries[dim].cat.categories[codes[codes >= 0]].astype(str).tolist()
+        if codes.size and codes[0] < 0:
+            values.append(na_label)
+        return sorted(set(values))
+
+    def sum_by(self, *dims):
+        """
+        Same as groupby(list(dims), observed=True)['cantidad'].sum().reset_index()
+        over the window's rows, computed on the groups instead of the rows
+        (memoized: treat the frame as read-only)
+        """
+        if dims not in self._sum_by:
+            self._sum_by[dims] = self._group_sums(dims)
+        return self._sum_by[dims]
+
+    def daily(self, by):
+        """Per-day totals of `by` in the window (see EventPrefixSums.daily), memoized"""
+        if by not in self._daily:
+            if self.prefix.cum_sums is None:
+                self._daily[by] = self.prefix.daily(None, None, by)
+            else:
+                self._daily[by] = self.prefix._daily_rows(*self.rows, by, self.mask)
+        return self._daily[by]
+
+    def _group_sums(self, dims):
+        keep = self.counts > 0
+        columns = {}
+        for dim in dims:
+            codes = self.prefix.group_codes[dim]
+            keep &= codes >= 0  # groupby drops missing keys
+            columns[dim] = codes
+        frame = pd.DataFrame({
+            dim: pd.Categorical.from_codes(codes[keep], dtype=self.prefix.dictionaries[dim].dtype)
+            for dim, codes in columns.items()
+        })
+        frame['cantidad'] = self.sums[keep].astype(self.prefix.dtype)
+        return frame.groupby(list(dims), observed=True, sort=True)['cantidad'].sum().reset_index()
+
+
+class EventPrefixSums:
+    """
+    Cumulative daily sums (and row counts) of cantidad per (tipo_evento,
+    turno, zona) group, over a dense calendar from the first event day
+
+    Row i of the cumulative tables holds the totals of the days before
+    day0 + i, so any window [start, end] is `cum[hi] - cum[lo]` with lo / hi
+    computed from the dates: two row reads whatever the history length.
+    Turno / zona filters select groups, never rows: every dimension value
+    has a bitmap over the groups, a multiselect is the OR of its values'
+    bitmaps and the filters are ANDed. Windows and their aggregates are
+    cached per (dates, filter combination).
+    """
+
+    def __init__(self, day0=None, cum_sums=None, cum_counts=None, group_codes=None, dictionaries=None,
+                 dtype=np.float64):
+        self.day0 = day0
+        self.cum_sums = cum_sums
+        self.cum_counts = cum_counts
+        self.group_codes = group_codes or {}
+        self.dictionaries = dictionaries or {}
+        self.dtype = dtype  # cantidad dtype of the partition, kept by sum_by
+        # dim -> bool (n_values + 1, n_groups); row 0 is the missing value
+        self.bitmaps = {
+            dim: np.arange(-1, len(self.dictionaries[dim].cat.categories))[:, None] == codes[None, :]
+            for dim, codes in self.group_codes.items()
+        }
+        self._windows = OrderedDict()
+        self._windows_lock = threading.Lock()
+
+    @classmethod
+    def from_partition(cls, eventos):
+        if eventos.empty or any(k not in eventos.columns for k in EVENT_KEYS):
+            return cls()
+
+        codes = np.column_stack([eventos[k].cat.codes.to_numpy() for k in EVENT_KEYS])
+        groups, group_ids = np.unique(codes, axis=0, return_inverse=True)
+        fechas = eventos['fecha'].to_numpy().astype('datetime64[D]')
+        day0 = fechas.min()
+        day_ids = (fechas - day0).astype(np.int64)
+        n_days, n_groups = int(day_ids.max()) + 1, len(groups)
+
+        # Daily tables, shifted one row down so row 0 is the empty prefix
+        sums = np.zeros((n_days + 1, n_groups), dtype=np.float64)
+        counts = np.zeros((n_days + 1, n_groups), dtype=np.int64)
+        np.add.at(sums, (day_ids + 1, group_ids.ravel()), eventos['cantidad'].to_numpy(dtype=np.float64))
+        np.add.at(counts, (day_ids + 1, group_ids.ravel()), 1)
+
+        return cls(
+            day0=day0,
+            cum_sums=np.cumsum(sums, axis=0),
+            cum_counts=np.cumsum(counts, axis=0),
+            group_codes={k: groups[:, i] for i, k in enumerate(EVENT_KEYS)},
+            dictionaries={k: eventos[k].iloc[:0] for k in EVENT_KEYS},
+            dtype=eventos['cantidad'].dtype,
+        )
+
+    def extend(self, ds, since):
+        """
+        Prefix sums of `ds` after rows were appended (see src.dataset.append_rows)
+
+        Rows before the earliest appended event day are kept; only the days
+        from there on are re-aggregated and re-accumulated on top of them.
+        Groups first seen in the new rows are added as columns.
+        """
+        start = since.get('eventos')
+        first = None if start is None else np.datetime64(pd.Timestamp(start).normalize(), 'D')
+        tail = appended_rows(ds, 'eventos', start)  # only these rows are read
+        if (self.cum_sums is None or ds.row_count('eventos') == 0
+                or any(k not in tail.columns for k in EVENT_KEYS)
+                or (first is not None and first < self.day0)):
+            return EventPrefixSums.from_partition(ds.partition('eventos'))
+
+        # Existing groups re-coded against the merged dictionaries
+        dictionaries = {k: tail[k].iloc[:0] for k in EVENT_KEYS}
+        groups = np.column_stack([
+            np.append(dictionaries[k].cat.categories.get_indexer(self.dictionaries[k].cat.categories), -1)[
+                self.group_codes[k]
+            ]
+            for k in EVENT_KEYS
+        ])
+        cum_sums, cum_counts = self.cum_sums, self.cum_counts
+
+        if first is not None:
+            codes = np.column_stack([tail[k].cat.codes.to_numpy() for k in EVENT_KEYS])
+            seen, inverse = np.unique(codes, axis=0, return_inverse=True)
+            lookup = {g: i for i, g in enumerate(map(tuple, groups.tolist()))}
+            for g in map(tuple, seen.tolist()):
+                lookup.setdefault(g, len(lookup))
+            group_ids = np.array([lookup[g] for g in map(tuple, seen.tolist())], dtype=np.int64)[inverse.ravel()]
+            if len(lookup) > len(groups):
+                groups = np.array(list(lookup), dtype=groups.dtype)
+
+            # Prefix row k holds the totals before `first`; days after the old
+            # table's end had no events, so its last row carries over
+            k = int((first - self.day0).astype(np.int64))
+            day_ids = (tail['fecha'].to_numpy().astype('datetime64[D]') - self.day0).astype(np.int64)
+            n_days = max(len(self.cum_sums) - 1, int(day_ids.max()) + 1)
+            n_old, n_groups = self.cum_sums.shape[1], len(groups)
+
+            sums = np.zeros((n_days - k, n_groups), dtype=np.float64)
+            counts = np.zeros((n_days - k, n_groups), dtype=np.int64)
+            np.add.at(sums, (day_ids - k, group_ids), tail['cantidad'].to_numpy(dtype=np.float64))
+            np.add.at(counts, (day_ids - k, group_ids), 1)
+
+            keep = min(k, len(self.cum_sums) - 1)
+            cum_sums = np.zeros((n_days + 1, n_groups), dtype=np.float64)
+            cum_counts = np.zeros((n_days + 1, n_groups), dtype=np.int64)
+            cum_sums[:keep + 1, :n_old] = self.cum_sums[:keep + 1]
+            cum_counts[:keep + 1, :n_old] = self.cum_counts[:keep + 1]
+            cum_sums[keep + 1:k + 1] = cum_sums[keep]
+            cum_counts[keep + 1:k + 1] = cum_counts[keep]
+            cum_sums[k + 1:] = cum_sums[k] + np.cumsum(sums, axis=0)
+            cum_counts[k + 1:] = cum_counts[k] + np.cumsum(counts, axis=0)
+
+        return EventPrefixSums(
+            day0=self.day0,
+            cum_sums=cum_sums,
+            cum_counts=cum_counts,
+            group_codes={k: groups[:, i] for i, k in enumerate(EVENT_KEYS)},
+            dictionaries=dictionaries,
+            dtype=tail['cantidad'].dtype,
+        )
+
+    def _row(self, fecha, after=False):
+        """Prefix row of a date (the first row past it when `after`), clipped to the table"""
+        day = np.datetime64(pd.Timestamp(fecha).normalize(), 'D')
+        i = int((day - self.day0).astype(np.int64)) + (1 if after else 0)
+        return min(max(i, 0), len(self.cum_sums) - 1)
+
+    def group_mask(self, na_label='N/A', **selections):
+        """
+        Groups kept by dimension filters, e.g. group_mask(turno=[...], zona=[...])
+
+        An empty or None selection keeps everything; `na_label` (the label
+        unique_labels shows for missing values) selects the groups where the
+        dimension is empty.
+        """
+        n_groups = self.cum_sums.shape[1] if self.cum_sums is not None else 0
+        mask = np.ones(n_groups, dtype=bool)
+        for dim, values in selections.items():
+            if not values:
+                continue
+            codes = codes_for(self.dictionaries[dim], values)
+            if na_label in values:
+                codes = np.append(codes, -1)
+            # OR of the selected values' bitmaps, ANDed with the other filters
+            mask &= self.bitmaps[dim][codes + 1].any(axis=0)
+        return mask
+
+    def window(self, start_date, end_date, mask=None):
+        """EventWindow of start_date <= fecha <= end_date, optionally only the groups in `mask`"""
+        if self.cum_sums is None:
+            return EventWindow(self, np.zeros(0), np.zeros(0, dtype=np.int64))
+        lo, hi = self._row(start_date), self._row(end_date, after=True)
+        hi = max(lo, hi)
+        key = (lo, hi, None if mask is None else np.packbits(mask).tobytes())
+        with self._windows_lock:
+            window = self._windows.get(key)
+            if window is not None:
+                self._windows.move_to_end(key)
+                return window
+
+        sums = self.cum_sums[hi] - self.cum_sums[lo]
+        counts = self.cum_counts[hi] - self.cum_counts[lo]
+        if mask is not None:
+            sums = np.where(mask, sums, 0.0)
+            counts = np.where(mask, counts, 0)
+        window = EventWindow(self, sums, counts, (lo, hi), mask)
+        with self._windows_lock:
+            self._windows[key] = window
+            while len(self._windows) > MAX_CACHED_WINDOWS:
+                self._windows.popitem(last=False)
+        return window
+
+    def daily(self, start_date, end_date, by, mask=None):
+        """
+        Per-day totals of `by` over [start_date, end_date], the same as
+        groupby(['fecha', by], observed=True)['cantidad'].sum().reset_index()
+        over the window's rows; costs O(days x groups), never O(rows)
+        """
+        if self.cum_sums is None:
+            return pd.DataFrame({'fecha': pd.Series(dtype='datetime64[s]'), by: pd.Series(dtype=object),
+                                 'cantidad': pd.Series(dtype=self.dtype)})
+        lo, hi = self._row(start_date), self._row(end_date, after=True)
+        return self._daily_rows(lo, max(lo, hi), by, mask)
+
+    def _daily_rows(self, lo, hi, by, mask=None):
+        dictionary = self.dictionaries[by]
+        sums = np.diff(self.cum_sums[lo:hi + 1], axis=0)
+        counts = np.diff(self.cum_counts[lo:hi + 1], axis=0)
+        if mask is not None:
+            sums[:, ~mask] = 0.0
+            counts[:, ~mask] = 0
+
+        # Groups -> `by` codes (missing keys dropped, as groupby does)
+        codes = self.group_codes[by]
+        valid = np.flatnonzero(codes >= 0)
+        onehot = np.zeros((len(codes), len(dictionary.cat.categories)), dtype=np.int64)
+        onehot[valid, codes[valid]] = 1
+        by_sums = sums @ onehot
+        day_idx, code_idx = np.nonzero((counts @ onehot) > 0)  # sorted by day, then code
+
+        return pd.DataFrame({
+            'fecha': (self.day0 + lo + day_idx).astype('datetime64[s]'),
+            by: pd.Categorical.from_codes(code_idx, dtype=dictionary.dtype),
+            'cantidad': by_sums[day_idx, code_idx].astype(self.dtype),
+        })
+
+
+def get_event_prefix(ds):
+    """The EventPrefixSums of a dataset version (built on first use, then reused)"""
+    return ds.aggregate(AGGREGATE_NAME, lambda d: EventPrefixSums.from_partition(d.partition('eventos')))
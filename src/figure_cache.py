@@ -0,0 +1,70 @@
+"""
+SIPOR Dashboard - Figure Cache
+Built Plotly figures reused across reruns and sessions (LRU-bounded)
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Figures kept in memory (a few cuts x 4 charts per dataset version)
+MAX_FIGURES = 64
+
+
+def frame_digest(df):
+    """Content hash of an aggregated frame (columns, dtypes and values)"""
+    h = hashlib.sha1()
+    h.update(repr([(c, str(t)) for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class FigureCache:
+    """
+    Thread-safe LRU of built figures
+
+    Cached figures are shared by every session: callers must treat them as
+    read-only (st.plotly_chart and to_image do not modify them).
+    """
+
+    def __init__(self, max_entries=MAX_FIGURES):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return fig
+            self.misses += 1
+
+        # Built outside the lock: a slow figure never blocks other sessions
+        fig = build()
+        with self._lock:
+            self._figures[key] = fig
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+
+_figure_cache = FigureCache()
+
+
+def cached_figure(version, kind, df, build):
+    """
+    Figure for (dataset version, chart kind, aggregated data), built with
+    build() only the first time that combination is drawn
+    """
+    return _figure_cache.get_or_build((version, kind, frame_digest(df)), build)
@@ -0,0 +1,274 @@
+"""
+SIPOR Dashboard - Forms Pipeline
+Builds Base_Operacion from the raw Microsoft Forms export, without Excel
+
+Python port of the workbook's Power Query chain
+(00_Base_Forms -> 01_Base_Limpia -> Base_Operacion). Usage:
+
+    python -m src.forms_pipeline export.xlsx -o Base_Operacion.xlsx
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.xlsx_reader import iter_sheet, DATE, NUMBER
+
+FORMS_SHEET = '00_Base_Forms'
+OUTPUT_SHEET = 'Base_Operacion'
+
+# Rows per chunk: memory stays bounded whatever the size of the export
+CHUNK_ROWS = 50_000
+
+# --- 01_Base_Limpia ---
+
+DROPPED_COLUMNS = ['Id', 'Hora de finalización', 'Correo electrónico', 'Nombre']
+
+# (new column, preferred source, fallback source)
+COALESCED_COLUMNS = [
+    ('Insumo', 'Tipo de insumo', 'Tipo de insumo1'),
+    ('SubZona', 'Patio', 'Bodega'),
+    ('Cantidad_Unica', 'Cantidad', 'Cantidad1'),
+]
+
+# --- Base_Operacion ---
+
+ESPACIOS_COLS = [
+    'Espacios de 77 TM', 'Espacios de 57,75 TM', 'Espacios de 22 TM',
+    'Espacios de 40,25 TM', 'Espacios de 35 TM', 'Espacios de 82,25 TM',
+    'Espacios de 29,75 TM', 'Espacios de 61,25 TM',
+]
+
+ESTADO_COLS = [
+    'Disponible', 'Clasificar', 'Reparar',
+    'Disponibles NPK-PPP', 'Clasificar NPK-PPP', 'Reparar NPK-PPP',
+    'Disponibles NICA', 'Clasificar NICA', 'Reparar NICA',
+]
+
+EVENTO_COLS = [
+    'Estibas reparadas NPK-PPP', 'Estibas reparadas NICA', 'Carpas reparadas',
+    'Estibas dadas de baja NPK-PPP', 'Estibas dadas de baja NICA', 'Carpas dadas de baja',
+]
+
+BASE_OPERACION_COLUMNS = [
+    'Fecha', 'Zona', 'SubZona', 'subtipo_insumo', 'cantidad',
+    'tipo_registro', 'estado', 'tipo_evento', 'insumo', 'turno',
+]
+
+# Typed reading of the export (normalized header -> kind)
+FORMS_TYPES = {
+    'hora de inicio': DATE,
+    'hora de finalización': DATE,
+    **{c.lower(): NUMBER for c in ESPACIOS_COLS + ESTADO_COLS + EVENTO_COLS},
+    'cantidad': NUMBER,
+    'cantidad1': NUMBER,
+}
+
+
+def _subtipo(label):
+    if 'NPK' in label:
+        return 'NPK-PPP'
+    if 'NICA' in label:
+        return 'NICA'
+    return None
+
+
+def _estado(label):
+    if 'Disponible' in label:
+        return 'disponible'
+    if 'Clasificar' in label:
+        return 'clasificar'
+    return 'reparar'
+
+
+# Per unpivoted column attributes, resolved once per column instead of per row
+ESPACIOS_ATTRS = {c: {'subtipo_insumo': c.split('Espacios de ', 1)[1]} for c in ESPACIOS_COLS}
+ESTADO_ATTRS = {c: {'estado': _estado(c), 'subtipo_insumo': _subtipo(c)} for c in ESTADO_COLS}
+EVENTO_ATTRS = {
+    c: {
+        'tipo_evento': 'reparada' if 'reparadas' in c else 'baja',
+        'insumo': 'carpa' if 'Carpas' in c else 'estiba',
+        'subtipo_insumo': _subtipo(c),
+    }
+    for c in EVENTO_COLS
+}
+
+
+def _column(df, name):
+    """Column of the chunk, or all-missing when the export does not have it"""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def clean_forms(df):
+    """
+    01_Base_Limpia: drop identity columns, derive Fecha, coalesce the
+    split Insumo / SubZona / Cantidad questions and drop flagged rows
+    (Observaciones filled in, e.g. PRUEBAS / ERROR)
+    """
+    df = df.drop(columns=[c for c in DROPPED_COLUMNS if c in df.columns])
+    df['Fecha'] = pd.to_datetime(_column(df, 'Hora de inicio'), errors='coerce').dt.normalize()
+    for target, first, second in COALESCED_COLUMNS:
+        df[target] = _column(df, first).combine_first(_column(df, second))
+        df = df.drop(columns=[c for c in (first, second) if c in df.columns])
+    return df[_column(df, 'Observaciones').isna().to_numpy()]
+
+
+def _unpivot(df, id_cols, value_cols, attrs):
+    """
+    Table.Unpivot: one row per (source row, non-empty value column), in row
+    then column order; `attrs` adds the columns derived from the column name
+    """
+    values = np.column_stack([_column(df, c).to_numpy(dtype=object) for c in value_cols])
+    keep = pd.notna(values).ravel()
+    rows = np.repeat(np.arange(len(df)), len(value_cols))[keep]
+    labels = np.tile(np.array(value_cols, dtype=object), len(df))[keep]
+
+    out = pd.DataFrame({c: _column(df, c).to_numpy()[rows] for c in id_cols})
+    out['cantidad'] = pd.to_numeric(pd.Series(values.ravel()[keep]), errors='coerce')
+    for field in next(iter(attrs.values())):
+        lookup = {c: a[field] for c, a in attrs.items()}
+        out[field] = pd.Series(labels).map(lookup).to_numpy()
+    return out
+
+
+def _normalize_insumo(series):
+    """Lower-case and collapse estiba(s) / carpa(s) / espacio(s) variants"""
+    text = series.astype(object).where(series.notna())
+    lowered = text.str.strip().str.lower()
+    for prefix in ('estiba', 'carpa', 'espacio'):
+        lowered = lowered.mask(lowered.str.startswith(prefix, na=False), prefix)
+    return lowered
+
+
+def build_base_operacion(limpia):
+    """
+    Base_Operacion rows of one cleaned chunk
+
+    Blocks, in the order Power Query combines them: espacios (estado
+    disponible), estibas/carpas counts per estado, plásticos, and the
+    reparada / baja events.
+    """
+    espacios = _unpivot(limpia, ['Fecha', 'Zona', 'SubZona'], ESPACIOS_COLS, ESPACIOS_ATTRS)
+    espacios = espacios.assign(insumo='espacio', tipo_registro='estado', estado='disponible')
+
+    estado = _unpivot(limpia, ['Fecha', 'Zona', 'SubZona', 'Insumo'], ESTADO_COLS, ESTADO_ATTRS)
+    estado = estado.assign(tipo_registro='estado', insumo=_normalize_insumo(estado['Insumo']))
+
+    insumo = _column(limpia, 'Insumo').astype(object)
+    is_plastico = insumo.str.strip().str.lower().isin(['plásticos', 'plasticos']).to_numpy()
+    plasticos = pd.DataFrame({
+        'Fecha': limpia['Fecha'].to_numpy()[is_plastico],
+        'Zona': _column(limpia, 'Zona').to_numpy()[is_plastico],
+        'SubZona': _column(limpia, 'SubZona').to_numpy()[is_plastico],
+        'cantidad': pd.to_numeric(limpia['Cantidad_Unica'], errors='coerce').to_numpy()[is_plastico],
+    }).assign(insumo='plastico', tipo_registro='estado', estado='disponible')
+
+    eventos = _unpivot(limpia, ['Fecha', 'Zona', 'SubZona', 'Turno'], EVENTO_COLS, EVENTO_ATTRS)
+    eventos = eventos.assign(tipo_registro='evento').rename(columns={'Turno': 'turno'})
+
+    out = pd.concat([espacios, estado, plasticos, eventos], ignore_index=True)
+    out = out.reindex(columns=BASE_OPERACION_COLUMNS)
+    out['SubZona'] = out['SubZona'].astype(object).str.replace(
+        'Reparación de estibas', 'Zona de reparación', regex=False
+    )
+    return out
+
+
+def iter_forms(path, sheet_name=FORMS_SHEET, chunk_rows=CHUNK_ROWS):
+    """Raw export chunks from an .xlsx (streamed) or .csv file"""
+    if path.lower().endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=chunk_rows, encoding='utf-8-sig')
+    else:
+        yield from iter_sheet(path, sheet_name, column_types=FORMS_TYPES, chunk_rows=chunk_rows)
+
+
+class _XlsxWriter:
+    """Write-only workbook with a single Base_Operacion sheet, row by row"""
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+        self.path = path
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet(OUTPUT_SHEET)
+        self.ws.append(BASE_OPERACION_COLUMNS)
+
+    def write(self, df):
+        df = df.astype(object).where(df.notna(), None)
+        df['Fecha'] = [None if v is None else v.date() for v in df['Fecha']]
+        for row in df.itertuples(index=False, name=None):
+            self.ws.append(row)
+
+    def close(self):
+        self.wb.save(self.path)
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, df):
+        df.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False,
+                  date_format='%Y-%m-%d')
+        self.header = False
+
+    def close(self):
+        if self.header:
+            pd.DataFrame(columns=BASE_OPERACION_COLUMNS).to_csv(self.path, index=False)
+
+
+def run_pipeline(source, output, sheet_name=FORMS_SHEET, chunk_rows=CHUNK_ROWS):
+    """
+    Forms export -> Base_Operacion file (.xlsx or .csv), chunk by chunk
+
+    The output is written to a temp file and renamed into place, so the
+    dashboard's reloader never sees a half-written workbook. Rows come out
+    block by block within each chunk; with a single chunk the order is
+    exactly Power Query's.
+
+    Returns:
+        dict: {'rows_in', 'rows_out', 'seconds'}
+    """
+    start = time.perf_counter()
+    root, ext = os.path.splitext(output)
+    tmp_path = f"{root}.{os.getpid()}.tmp{ext}"
+    writer = _CsvWriter(tmp_path) if ext.lower() == '.csv' else _XlsxWriter(tmp_path)
+
+    rows_in = rows_out = 0
+    try:
+        for chunk in iter_forms(source, sheet_name, chunk_rows):
+            rows_in += len(chunk)
+            if chunk.empty:
+                continue
+            base = build_base_operacion(clean_forms(chunk))
+            rows_out += len(base)
+            writer.write(base)
+        writer.close()
+        os.replace(tmp_path, output)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+    return {'rows_in': rows_in, 'rows_out': rows_out, 'seconds': time.perf_counter() - start}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('source', help="Export de Forms (.xlsx o .csv)")
+    parser.add_argument('-o', '--output', default='Base_Operacion.xlsx', help="Archivo de salida (.xlsx o .csv)")
+    parser.add_argument('--sheet', default=FORMS_SHEET, help="Hoja del export cuando es .xlsx")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    stats = run_pipeline(args.source, args.output, args.sheet, args.chunk_rows)
+    print(f"{stats['rows_in']} filas de Forms -> {stats['rows_out']} filas de Base_Operacion "
+          f"en {stats['seconds']:.2f} s ({args.output})")
+
+
+if __name__ == '__main__':
+    main()
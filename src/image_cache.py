@@ -0,0 +1,120 @@
+"""
+SIPOR Dashboard - Chart Image Cache
+Rendered chart images (PNG / SVG) on disk, content-addressed and shared by every process
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import plotly
+
+from src import config
+
+IMAGE_FORMATS = ('png', 'svg')
+
+
+def image_key(fig, fmt, width, height, scale):
+    """Hash of the figure spec and the render parameters"""
+    digest = hashlib.sha256()
+    params = {'format': fmt, 'width': width, 'height': height, 'scale': scale, 'plotly': plotly.__version__}
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    digest.update(fig.to_json().encode())
+    return digest.hexdigest()
+
+
+class ImageCache:
+    """
+    Folder of `<key>.<format>` files with size-bounded LRU eviction
+
+    Recency is the file mtime (touched on every hit), so processes sharing the
+    folder share one LRU order. Files are written to a temp name and renamed
+    into place: a reader never sees a partial image.
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+
+    def _path(self, key, fmt):
+        return os.path.join(self.folder, f"{key}.{fmt}")
+
+    def get(self, key, fmt):
+        path = self._path(key, fmt)
+        try:
+            with open(path, 'rb') as fh:
+                data = fh.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def put(self, key, fmt, data):
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(key, fmt)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as fh:
+                fh.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used images until the folder fits max_bytes"""
+        entries = []
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.name.rsplit('.', 1)[-1] in IMAGE_FORMATS:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # evicted by another process meanwhile
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+
+    def get_or_render(self, fig, fmt, width, height, scale, render):
+        key = image_key(fig, fmt, width, height, scale)
+        data = self.get(key, fmt)
+        if data is None:
+            data = render()
+            try:
+                self.put(key, fmt, data)
+            except OSError:
+                pass  # read-only or full disk: the image is still returned
+        return data
+
+
+def get_image_cache():
+    """Cache configured in src.config, or None when disabled"""
+    if config.IMAGE_CACHE_MB <= 0:
+        return None
+    return ImageCache(os.path.abspath(config.IMAGE_CACHE_DIR), int(config.IMAGE_CACHE_MB * 1024 * 1024))
+
+
+def render_image(fig, fmt='png', width=800, height=350, scale=2):
+    """
+    Image bytes of a Plotly figure; kaleido only runs when this exact figure
+    and render parameters are not on disk yet
+    """
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"Formato de imagen no soportado: {fmt}")
+
+    def render():
+        return fig.to_image(format=fmt, width=width, height=height, scale=scale)
+
+    cache = get_image_cache()
+    if cache is None:
+        return render()
+    return cache.get_or_render(fig, fmt, width, height, scale, render)
@@ -0,0 +1,161 @@
+"""
+SIPOR Dashboard - Inventory Delta Engine
+Dense (fecha x label) stock matrices per grain, built once per dataset version
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import appended_rows
+
+# Grains the deltas can be computed at: column -> display label
+GRAINS = {
+    'insumo': "Insumo",
+    'zona': "Zona",
+    'subzona': "Subzona",
+    'estado': "Estado",
+}
+
+AGGREGATE_NAME = 'inventory_pivot'
+
+DELTA_COLUMNS = ['Inicio', 'Fin', 'Delta', 'Delta %']
+
+
+class InventoryPivot:
+    """
+    Sum of cantidad per (cut date, label) for every grain, as dense NumPy
+    matrices (rows = cut dates, columns = the grain's dictionary)
+
+    A delta between two cuts is one row subtraction, and the top-N movers an
+    argpartition over it: the cost depends on the number of labels, never
+    on the number of inventory rows.
+    """
+
+    def __init__(self, dates=None, values=None, present=None, labels=None):
+        self.dates = dates if dates is not None else np.array([], dtype='datetime64[s]')
+        self.positions = {d: i for i, d in enumerate(self.dates.astype(np.int64).tolist())}
+        self.values = values or {}    # grain -> float64 (n_dates, n_labels)
+        self.present = present or {}  # grain -> bool, label has rows at that cut
+        self.labels = labels or {}    # grain -> Index of labels
+
+    @classmethod
+    def from_partition(cls, inventario):
+        if inventario.empty:
+            return cls()
+        fechas = inventario['fecha'].to_numpy().astype('datetime64[s]')
+        dates, day_ids = np.unique(fechas, return_inverse=True)
+        cantidad = inventario['cantidad'].to_numpy(dtype=np.float64)
+
+        values, present, labels = {}, {}, {}
+        for grain in GRAINS:
+            if grain not in inventario.columns:
+                continue
+            codes = inventario[grain].cat.codes.to_numpy()
+            categories = inventario[grain].cat.categories
+            keep = codes >= 0  # rows without a label are left out, as groupby does
+            flat = day_ids[keep] * len(categories) + codes[keep]
+            shape = (len(dates), len(categories))
+            size = shape[0] * shape[1]
+            values[grain] = np.bincount(flat, weights=cantidad[keep], minlength=size).reshape(shape)
+            present[grain] = np.bincount(flat, minlength=size).reshape(shape) > 0
+            labels[grain] = categories.astype(str)
+        return cls(dates, values, present, labels)
+
+    def extend(self, ds, since):
+        """
+        Pivot of `ds` after rows were appended (see src.dataset.append_rows)
+
+        Cut rows before the earliest appended inventory date are kept (their
+        columns re-mapped onto the merged dictionaries); only the cuts from
+        there on are re-aggregated.
+        """
+        start = since.get('inventario')
+        if not len(self.dates) or ds.row_count('inventario') == 0:
+            return InventoryPivot.from_partition(ds.partition('inventario'))
+        tail = appended_rows(ds, 'inventario', start)  # only these rows are read
+        if start is None:
+            cutoff = len(self.dates)
+        else:
+            cutoff = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), 's'), 'left'))
+        fresh = InventoryPivot.from_partition(tail)
+        dates = np.concatenate([self.dates[:cutoff], fresh.dates])
+
+        values, present, labels = {}, {}, {}
+        for grain in GRAINS:
+            if grain not in tail.columns:
+                continue
+            labels[grain] = tail[grain].cat.categories.astype(str)
+            shape = (len(dates), len(labels[grain]))
+            values[grain] = np.zeros(shape, dtype=np.float64)
+            present[grain] = np.zeros(shape, dtype=bool)
+            if grain in self.values:
+                cols = labels[grain].get_indexer(self.labels[grain])
+                if (cols < 0).any():
+                    return InventoryPivot.from_partition(ds.partition('inventario'))
+                values[grain][:cutoff, cols] = self.values[grain][:cutoff]
+                present[grain][:cutoff, cols] = self.present[grain][:cutoff]
+            if grain in fresh.values:
+                # The slice keeps the partition's dictionary: same columns
+                values[grain][cutoff:] = fresh.values[grain]
+                present[grain][cutoff:] = fresh.present[grain]
+        return InventoryPivot(dates, values, present, labels)
+
+    @property
+    def grains(self):
+        return [g for g in GRAINS if g in self.values]
+
+    def cut_range(self, start_date, end_date):
+        """First and last cut dates within [start_date, end_date], or (None, None)"""
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date), 's'), 'left')
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date), 's'), 'right') - 1
+        if lo > hi:
+            return None, None
+        return pd.Timestamp(self.dates[lo]), pd.Timestamp(self.dates[hi])
+
+    def _row(self, fecha):
+        key = int(np.datetime64(pd.Timestamp(fecha), 's').astype(np.int64))
+        if key not in self.positions:
+            raise KeyError(f"{fecha} no es una fecha de corte")
+        return self.positions[key]
+
+    def _vectors(self, grain, start_date, end_date):
+        a, b = self._row(start_date), self._row(end_date)
+        inicio, fin = self.values[grain][a], self.values[grain][b]
+        # Labels with rows at either cut (outer join of the two cuts)
+        cols = np.flatnonzero(self.present[grain][a] | self.present[grain][b])
+        return inicio[cols], fin[cols], cols
+
+    def _frame(self, grain, inicio, fin, cols):
+        delta = fin - inicio
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = delta / inicio * 100
+        return pd.DataFrame({
+            grain: self.labels[grain][cols].to_numpy(),
+            'Inicio': inicio,
+            'Fin': fin,
+            'Delta': delta,
+            'Delta %': np.where(np.isnan(pct), 0.0, pct),  # 0 / 0 -> 0, x / 0 stays inf
+        })
+
+    def delta(self, grain, start_date, end_date):
+        """Inicio, Fin, Delta and Delta % per label between two cut dates"""
+        inicio, fin, cols = self._vectors(grain, start_date, end_date)
+        return self._frame(grain, inicio, fin, cols)
+
+    def top(self, grain, start_date, end_date, n=5, increases=True):
+        """
+        The n largest increases (or decreases) between two cut dates, largest
+        move first; ties keep the dictionary order
+        """
+        inicio, fin, cols = self._vectors(grain, start_date, end_date)
+        score = (fin - inicio) if increases else (inicio - fin)
+        idx = np.flatnonzero(score > 0)
+        if len(idx) > n:
+            idx = idx[np.argpartition(-score[idx], n - 1)[:n]]
+        idx = idx[np.lexsort((idx, -score[idx]))]
+        return self._frame(grain, inicio[idx], fin[idx], cols[idx])
+
+
+def get_inventory_pivot(ds):
+    """The InventoryPivot of a dataset version (built on first use, then reused)"""
+    return ds.aggregate(AGGREGATE_NAME, lambda d: InventoryPivot.from_partition(d.partition('inventario')))
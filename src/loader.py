@@ -6,122 +6,361 @@ Handles loading and validation of data from Excel
 import streamlit as st
 import pandas as pd
 import os
+import threading
 from datetime import datetime
 
-# Cached function to load the raw Excel file
-@st.cache_data(ttl=300)
-def load_raw_data(file_path='Balance_Insumos.xlsx'):
+from src import config
+from src.xlsx_reader import read_sheet_state, BASE_OPERACION_TYPES
+from src.disk_cache import (
+    read_cached_frame, read_stale_frame, read_cache_meta, write_cached_frame,
+    append_cached_frame, workbook_fingerprint, file_sha256,
+)
+from src.dataset import build_dataset, append_rows, unique_labels, FECHA_INDEX
+from src.sqlite_store import import_sqlite_dataset, append_sqlite_dataset, open_sqlite_dataset
+from src.reloader import DatasetReloader
+from src.cube import get_kpi_cube
+from src.event_cube import get_event_prefix
+from src.inventory_delta import get_inventory_pivot
+
+def _normalize_base_operacion(df):
+    """Standardize the parsed sheet: column names, fecha and cantidad types"""
+    # Standardize column names (strip whitespace, lowercase)
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    
+    # Map expected columns to standardized names if needed, or just use as is
+    # Expected from prompt: Fecha, Zona, SubZona, insumo, subtipo_insumo,
+    # tipo_registro, estado, tipo_evento, turno, cantidad
+    
+    # Ensure date column is datetime
+    if 'fecha' in df.columns:
+        df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
+    
+    # Ensure numeric quantity
+    if 'cantidad' in df.columns:
+        df['cantidad'] = pd.to_numeric(df['cantidad'], errors='coerce').fillna(0)
+    
+    return df
 
+def _parse_base_operacion_state(file_path, reader=None, previous=None):
+    """parse_base_operacion plus the sheet state / appended flag of the stream reader"""
+    reader = reader or config.EXCEL_READER
+    
+    # Read the specific sheet
+    if reader == 'stream':
+        df, state, appended = read_sheet_state(
+            file_path, sheet_name='Base_Operacion', column_types=BASE_OPERACION_TYPES, previous=previous
+        )
+    else:
+        df = pd.read_excel(file_path, sheet_name='Base_Operacion', engine='openpyxl')
+        state, appended = None, False
+    
+    return _normalize_base_operacion(df), state, appended
+
+def parse_base_operacion(file_path, reader=None):
     """
-    Load raw data from Excel file
+    Parse the Base_Operacion sheet from the Excel workbook (no caching)
     
     Args:
         file_path: Path to the Excel file
-        
+        reader: 'stream' (single-sheet XML streaming) or 'openpyxl';
+            defaults to config.EXCEL_READER
+    
     Returns:
-        pd.DataFrame: Raw data from Base_Operacion sheet
+        pd.DataFrame: Normalized Base_Operacion data
+    """
+    return _parse_base_operacion_state(file_path, reader)[0]
+
+def ingest_base_operacion(file_path, have_version=None):
+    """
+    Bring Base_Operacion up to date, parsing only what changed
+    
+    The disk cache remembers how far the sheet was read (row count and a
+    hash of the raw rows). When the workbook only gained rows at the end,
+    just those rows are parsed and stored as a new cache part; an edit to
+    any earlier row triggers a full parse.
+    
+    Args:
+        file_path: Path to the Excel file
+        have_version: Version token of the data the caller already holds
+    
+    Returns:
+        tuple: (frame, delta), exactly one of them set. `delta` holds the
+        rows appended on top of `have_version`; otherwise `frame` is the
+        whole sheet.
+    """
+    df = read_cached_frame(file_path)
+    if df is not None:
+        return df, None
+    
+    # Fingerprint before parsing so edits made mid-parse invalidate the cache
+    fingerprint = workbook_fingerprint(file_path)
+    meta = read_cache_meta(file_path)
+    previous = meta.get('sheet_state') if meta else None
+    
+    df, state, appended = _parse_base_operacion_state(file_path, previous=previous)
+    if appended:
+        if have_version is not None and meta['sha256'][:16] == have_version:
+            append_cached_frame(file_path, df, fingerprint, state)
+            return None, df
+        base, _ = read_stale_frame(file_path)
+        if base is not None and list(base.columns) == list(df.columns):
+            append_cached_frame(file_path, df, fingerprint, state)
+            return pd.concat([base, df], ignore_index=True), None
+        # Cached rows unreadable: start over
+        df, state, _ = _parse_base_operacion_state(file_path)
+    
+    write_cached_frame(file_path, df, fingerprint, sheet_state=state)
+    return df, None
+
+def read_base_operacion(file_path):
+    """
+    Read Base_Operacion through the on-disk columnar cache
+    
+    The workbook is only parsed when the cache is missing or its
+    fingerprint (size, mtime, content hash) no longer matches, and then
+    only the appended rows when that is all that changed.
     """
+    return ingest_base_operacion(file_path)[0]
+
+def _read_or_report(file_path):
+    """Read Base_Operacion, surfacing errors in the UI and returning an empty frame"""
     try:
         if not os.path.exists(file_path):
             st.error(f"❌ Archivo no encontrado: {file_path}")
             return pd.DataFrame()
         
-        # Read the specific sheet
-        df = pd.read_excel(file_path, sheet_name='Base_Operacion', engine='openpyxl')
-        
-        # Standardize column names (strip whitespace, lowercase)
-        df.columns = df.columns.astype(str).str.strip().str.lower()
-        
-        # Map expected columns to standardized names if needed, or just use as is
-        # Expected from prompt: Fecha, Zona, SubZona, insumo, subtipo_insumo, 
-        # tipo_registro, estado, tipo_evento, turno, cantidad
-        
-        # Ensure date column is datetime
-        if 'fecha' in df.columns:
-            df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
-            
-        # Ensure numeric quantity
-        if 'cantidad' in df.columns:
-            df['cantidad'] = pd.to_numeric(df['cantidad'], errors='coerce').fillna(0)
-            
-        return df
+        return read_base_operacion(file_path)
         
     except Exception as e:
         st.error(f"❌ Error al cargar archivo Excel: {str(e)}")
         return pd.DataFrame()
 
-def load_inventario():
+# Version memo: absolute path -> ((size, mtime_ns), token)
+_version_lock = threading.Lock()
+_version_memo = {}
+
+def get_data_version(file_path='Balance_Insumos.xlsx'):
     """
-    Get inventory data (tipo_registro = 'estado')
+    Dataset version token of the workbook (None if it does not exist)
+
+    Costs one stat call per rerun: the content hash is only recomputed when
+    size or mtime move, and the token only changes when the content does.
+    Every cache derived from the workbook is keyed on this token, so data
+    refreshes exactly when the file changes and never in between.
+    """
+    try:
+        st_info = os.stat(file_path)
+    except OSError:
+        return None
     
-    Returns:
-        pd.DataFrame: Inventory data
+    key = os.path.abspath(file_path)
+    stamp = (st_info.st_size, st_info.st_mtime_ns)
+    with _version_lock:
+        memo = _version_memo.get(key)
+    if memo and memo[0] == stamp:
+        return memo[1]
+    
+    token = file_sha256(file_path)[:16]
+    with _version_lock:
+        _version_memo[key] = (stamp, token)
+    return token
+
+# Keyed on (file, version): recomputed once per workbook change, never on a timer
+@st.cache_data(max_entries=4)
+def _load_raw_data_version(file_path, version):
+    return _read_or_report(file_path)
+
+def load_raw_data(file_path='Balance_Insumos.xlsx'):
+
     """
-    df = load_raw_data()
+    Load raw data from Excel file
     
-    if df.empty:
-        return df
-        
-    # Filter for inventory state
-    if 'tipo_registro' in df.columns:
-        # Case insensitive check
-        mask = df['tipo_registro'].astype(str).str.strip().str.lower() == 'estado'
-        df_inv = df[mask].copy()
-        
-        # Validate critical columns for inventory
-        required = ['fecha', 'zona', 'subzona', 'insumo', 'cantidad', 'estado']
-        missing = [col for col in required if col not in df_inv.columns]
+    Args:
+        file_path: Path to the Excel file
         
-        if missing:
-            st.warning(f"⚠️ Columnas faltantes para inventario: {', '.join(missing)}")
-            return pd.DataFrame()
-            
-        return df_inv
-    
-    return pd.DataFrame()
+    Returns:
+        pd.DataFrame: Raw data from Base_Operacion sheet
+    """
+    return _load_raw_data_version(file_path, get_data_version(file_path))
+
+def _warm_aggregates(ds):
+    """Build the per-version aggregates on the reloader thread, off the request path"""
+    get_kpi_cube(ds)
+    get_event_prefix(ds)
+    get_inventory_pivot(ds)
+    return ds
 
-def load_eventos():
+def _build_dataset(file_path, version, previous=None):
     """
-    Get events data (tipo_registro = 'evento')
+    Read + partition one workbook version (runs on the reloader thread)
     
+    When the workbook only gained rows since `previous` (the Dataset
+    currently served), those rows are appended to it instead of rebuilding.
+    """
+    have = previous.version if previous is not None else None
+    frame, delta = ingest_base_operacion(file_path, have_version=have)
+    if delta is not None:
+        return _warm_aggregates(append_rows(previous, delta, version=version))
+    return _warm_aggregates(build_dataset(frame, version=version))
+
+def _build_sqlite_dataset(file_path, version, previous=None):
+    """Open the SQLite import of this version, importing (or appending to) it if needed"""
+    store = open_sqlite_dataset(file_path, version)
+    if store is not None:
+        return _warm_aggregates(store)
+    have = previous.version if previous is not None else None
+    frame, delta = ingest_base_operacion(file_path, have_version=have)
+    if delta is not None:
+        store = append_sqlite_dataset(file_path, previous, delta, version)
+        if store is not None:
+            return _warm_aggregates(store)
+        frame = read_base_operacion(file_path)
+    return _warm_aggregates(import_sqlite_dataset(file_path, frame, version))
+
+def build_workbook_dataset(file_path):
+    """
+    Dataset of a workbook built synchronously, without the background
+    reloader or a Streamlit session (batch scripts)
+
+    Uses the configured storage backend and the same disk caches as the app.
+    """
+    version = get_data_version(file_path)
+    if version is None:
+        raise FileNotFoundError(file_path)
+    build = _build_sqlite_dataset if config.STORAGE_BACKEND == 'sqlite' else _build_dataset
+    return build(file_path, version)
+
+# One reloader per workbook for the whole process, shared by all sessions
+@st.cache_resource
+def get_reloader(file_path='Balance_Insumos.xlsx'):
+    """Background reloader keeping the current Dataset of `file_path` up to date"""
+    build = _build_sqlite_dataset if config.STORAGE_BACKEND == 'sqlite' else _build_dataset
+    return DatasetReloader(
+        file_path, build, get_data_version,
+        poll_seconds=config.RELOAD_POLL_SECONDS,
+    ).start()
+
+def load_dataset(file_path='Balance_Insumos.xlsx'):
+    """
+    Current Dataset of the workbook
+
+    Served from the background reloader, so a rerun never parses the
+    workbook; only the very first load of a process waits for it. Read it
+    once per rerun and derive everything from that object to stay on a
+    single version.
+
+    Args:
+        file_path: Path to the Excel file
+
     Returns:
-        pd.DataFrame: Events data
+        Dataset (or SqliteDataset with config.STORAGE_BACKEND = 'sqlite'):
+        normalized, partitioned data; its `version` attribute is the key
+        for every downstream cache
     """
-    df = load_raw_data()
+    reloader = get_reloader(file_path)
+    snapshot = reloader.current
+    if snapshot is None:
+        with st.spinner("Cargando datos..."):
+            snapshot = reloader.wait_ready()
     
-    if df.empty:
-        return df
-        
-    # Filter for events
-    if 'tipo_registro' in df.columns:
-        # Case insensitive check
-        mask = df['tipo_registro'].astype(str).str.strip().str.lower() == 'evento'
-        df_evt = df[mask].copy()
+    if reloader.last_error:
+        if snapshot is None:
+            st.error(f"❌ Error al cargar archivo Excel: {reloader.last_error}")
+        else:
+            st.warning(f"⚠️ No se pudo recargar el archivo, mostrando la versión anterior: {reloader.last_error}")
+    
+    if snapshot is None:
+        return build_dataset(pd.DataFrame())
+    return snapshot.dataset
+
+def show_data_status(file_path='Balance_Insumos.xlsx'):
+    """Sidebar block with the dataset version, load time and data age"""
+    snapshot = get_reloader(file_path).current
+    if snapshot is None:
+        return
+    
+    age = datetime.now() - snapshot.source_mtime
+    minutes = int(age.total_seconds() // 60)
+    if minutes < 60:
+        age_txt = f"{minutes} min"
+    elif minutes < 48 * 60:
+        age_txt = f"{minutes // 60} h {minutes % 60} min"
+    else:
+        age_txt = f"{minutes // (24 * 60)} días"
+    
+    st.sidebar.markdown("---")
+    st.sidebar.caption(
+        f"📦 Versión de datos: `{snapshot.version[:8]}`  \n"
+        f"⏱️ Cargada: {snapshot.loaded_at.strftime('%d-%m %H:%M:%S')} ({snapshot.load_seconds:.2f} s)  \n"
+        f"🕒 Antigüedad: {age_txt}"
+    )
+
+def _load_partition(kind, ds=None):
+    ds = ds or load_dataset()
+    
+    if ds.row_count(kind) == 0:
+        return pd.DataFrame()
         
-        # Validate critical columns for events
-        required = ['fecha', 'zona', 'insumo', 'cantidad', 'tipo_evento', 'turno']
-        missing = [col for col in required if col not in df_evt.columns]
+    # Validate critical columns for the partition
+    missing = ds.missing[kind]
+    if missing:
+        st.warning(f"⚠️ Columnas faltantes para {kind}: {', '.join(missing)}")
+        return pd.DataFrame()
         
-        if missing:
-            st.warning(f"⚠️ Columnas faltantes para eventos: {', '.join(missing)}")
-            return pd.DataFrame()
-            
-        # Standardize event type
-        if 'tipo_evento' in df_evt.columns:
-            df_evt['tipo_evento'] = df_evt['tipo_evento'].astype(str).str.strip().str.title()
-            
-        return df_evt
+    return ds.partition(kind)
+
+def load_inventario(ds=None):
+    """
+    Get inventory data (tipo_registro = 'estado')
     
-    return pd.DataFrame()
+    Args:
+        ds: Dataset to read from; defaults to the current one
+    
+    Returns:
+        pd.DataFrame: Inventory data (read-only view of the cached partition)
+    """
+    return _load_partition('inventario', ds)
 
-def get_unique_values(df, column):
+def load_eventos(ds=None):
+    """
+    Get events data (tipo_registro = 'evento')
+    
+    Args:
+        ds: Dataset to read from; defaults to the current one
+    
+    Returns:
+        pd.DataFrame: Events data (read-only view of the cached partition)
+    """
+    return _load_partition('eventos', ds)
+
+def validate_partition(kind, source_name, ds=None):
+    """
+    Check that a partition ('inventario' / 'eventos') has its critical
+    columns and at least one row, without loading it
+    """
+    ds = ds or load_dataset()
+    missing = ds.missing[kind]
+    if missing:
+        st.warning(f"⚠️ Columnas faltantes para {kind}: {', '.join(missing)}")
+    if missing or ds.row_count(kind) == 0:
+        st.warning(f"⚠️ No se encontraron datos válidos para {source_name}")
+        return False
+    return True
+
+def get_unique_values(df, column, ds=None, start_date=None, end_date=None):
     """
     Get sorted unique values from a column
+    
+    `df` may also be a partition name ('inventario' / 'eventos'): the values
+    are then read from the storage backend, optionally within a date range.
     """
+    if isinstance(df, str):
+        return (ds or load_dataset()).unique_values(df, column, start_date, end_date)
+    
     if df.empty or column not in df.columns:
         return []
     
-    return sorted(df[column].astype(str).replace('nan', 'N/A').unique().tolist())
+    return unique_labels(df[column])
 
 def validate_data_exists(df, source_name="datos"):
     """
@@ -132,16 +371,52 @@ def validate_data_exists(df, source_name="datos"):
         return False
     return True
 
-def get_date_range(df, column='fecha'):
-    """Get min and max date"""
+def _has_sorted_date_index(df, column):
+    """True for frames carrying the sorted fecha index built by src.dataset"""
+    return (
+        column == 'fecha'
+        and df.index.name == FECHA_INDEX
+        and df.index.is_monotonic_increasing  # cached on the index, O(1) after first use
+    )
+
+def get_date_range(df, column='fecha', ds=None):
+    """
+    Get min and max date
+    
+    `df` may also be a partition name, answered by the storage backend.
+    """
+    if isinstance(df, str):
+        return (ds or load_dataset()).date_range(df)
     if df.empty or column not in df.columns:
         return None, None
+    if _has_sorted_date_index(df, column):
+        return df.index[0], df.index[-1]
     return df[column].min(), df[column].max()
 
-def filter_by_date_range(df, start_date, end_date, column='fecha'):
-    """Filter by date range"""
+def filter_by_date_range(df, start_date, end_date, column='fecha', ds=None):
+    """
+    Filter by date range (inclusive)
+
+    Frames sorted by fecha (the Dataset partitions and anything filtered from
+    them) are cut with two binary searches into a zero-copy slice. `df` may
+    also be a partition name: only the rows in range are then fetched from
+    the storage backend (sorted slice or indexed SQL).
+    """
+    if isinstance(df, str):
+        return (ds or load_dataset()).between(df, start_date, end_date)
     if df.empty or column not in df.columns:
         return df
     
+    if _has_sorted_date_index(df, column):
+        lo = df.index.searchsorted(pd.to_datetime(start_date), side='left')
+        hi = df.index.searchsorted(pd.to_datetime(end_date), side='right')
+        return df.iloc[lo:max(lo, hi)]
+    
     mask = (df[column] >= pd.to_datetime(start_date)) & (df[column] <= pd.to_datetime(end_date))
     return df[mask]
+
+def filter_by_date(df, date, column='fecha', ds=None):
+    """Rows of a single cut date"""
+    if isinstance(df, str):
+        return (ds or load_dataset()).snapshot(df, date)
+    return filter_by_date_range(df, date, date, column, ds=ds)
@@ -0,0 +1,177 @@
+"""
+SIPOR Dashboard - PDF Vector Charts
+Bar charts drawn with FPDF primitives straight from the cube rows (no kaleido / browser)
+"""
+
+import math
+
+import pandas as pd
+
+from src.styles import COLORS, LOCATION_COLORS
+
+# Series colors of the espacios stacked bars (cycled past 8 sizes)
+SERIES_PALETTE = [
+    COLORS['blue'], COLORS['yellow'], COLORS['success'], COLORS['info'],
+    COLORS['warning'], COLORS['danger'], COLORS['estibas'], COLORS['gray'],
+]
+
+FONT = 'Helvetica'
+
+# Plot area paddings (mm): y tick labels, legend, rotated x labels; widest bar
+AXIS_W = 16
+LEGEND_H = 7
+XLABEL_H = 24
+MAX_BAR_W = 24
+
+
+def _rgb(hex_color):
+    hex_color = hex_color.lstrip('#')
+    return tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _nice_step(span, ticks=5):
+    """1 / 2 / 2.5 / 5 x 10^k step giving about `ticks` gridlines"""
+    raw = span / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 2.5, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+def _fmt(value):
+    return f"{value:,.0f}"
+
+
+def _matrix(rows, category, series, value):
+    """category x series sums, both in order of first appearance"""
+    df = pd.DataFrame({
+        'c': rows[category].astype(str).to_numpy(),
+        's': rows[series].astype(str).to_numpy() if series in rows.columns else '',
+        'v': rows[value].to_numpy(dtype=float),
+    })
+    table = df.pivot_table(index='c', columns='s', values='v', aggfunc='sum', fill_value=0, sort=False)
+    return table.reindex(index=pd.unique(df['c']), columns=pd.unique(df['s']), fill_value=0)
+
+
+def draw_bar_chart(pdf, rows, category, series, colors, x, y, w, h,
+                   value='cantidad', label_inside=False, series_order=None):
+    """
+    Vertical bars of `value` per `category`, stacked by `series`
+
+    Args:
+        colors: dict series label -> hex color, or a list cycled in order
+        label_inside: value printed inside each segment (stacked charts) instead
+            of above the bar
+        series_order: legend / stacking order of the series labels
+    """
+    if rows is None or len(rows) == 0:
+        pdf.set_font(FONT, 'I', 9)
+        pdf.set_xy(x, y + h / 2)
+        pdf.cell(w, 5, "Sin datos", align='C')
+        return
+
+    table = _matrix(rows, category, series, value)
+    if series_order is not None:
+        ordered = [s for s in series_order if s in table.columns]
+        table = table[ordered + [s for s in table.columns if s not in ordered]]
+    if isinstance(colors, dict):
+        palette = [colors.get(s, COLORS['gray']) for s in table.columns]
+    else:
+        palette = [colors[i % len(colors)] for i in range(len(table.columns))]
+
+    # Plot area
+    px0, py0 = x + AXIS_W, y + LEGEND_H
+    pw, ph = w - AXIS_W, h - LEGEND_H - XLABEL_H
+    totals = table.to_numpy().sum(axis=1)
+    top = max(float(totals.max()), 1.0) * (1.0 if label_inside else 1.12)
+    step = _nice_step(top)
+    y_max = math.ceil(top / step) * step
+    scale = ph / y_max
+
+    # Gridlines + y tick labels
+    pdf.set_font(FONT, '', 7)
+    pdf.set_text_color(*_rgb(COLORS['gray']))
+    pdf.set_draw_color(*_rgb(COLORS['grid']))
+    pdf.set_line_width(0.1)
+    tick = 0.0
+    while tick <= y_max + 1e-9:
+        ty = py0 + ph - tick * scale
+        pdf.line(px0, ty, px0 + pw, ty)
+        pdf.set_xy(x, ty - 2)
+        pdf.cell(AXIS_W - 1.5, 4, _fmt(tick), align='R')
+        tick += step
+
+    # Bars
+    slot = pw / len(table)
+    bar_w = min(slot * 0.7, MAX_BAR_W)
+    values = table.to_numpy()
+    for i, label in enumerate(table.index):
+        bx = px0 + i * slot + (slot - bar_w) / 2
+        base = py0 + ph
+        for j, color in enumerate(palette):
+            v = values[i, j]
+            if v <= 0:
+                continue
+            seg = v * scale
+            base -= seg
+            pdf.set_fill_color(*_rgb(color))
+            pdf.rect(bx, base, bar_w, seg, style='F')
+            if label_inside and seg >= 3.5:
+                pdf.set_font(FONT, '', 6.5)
+                pdf.set_text_color(*_rgb(COLORS['white']))
+                pdf.set_xy(bx, base + seg / 2 - 2)
+                pdf.cell(bar_w, 4, _fmt(v), align='C')
+        if not label_inside and totals[i] > 0:
+            pdf.set_font(FONT, '', 7)
+            pdf.set_text_color(*_rgb(COLORS['dark']))
+            pdf.set_xy(bx - slot * 0.15, base - 4.5)
+            pdf.cell(bar_w + slot * 0.3, 4, _fmt(totals[i]), align='C')
+
+        # X label, rotated 45 degrees and ending under the bar center
+        pdf.set_font(FONT, '', 6.5)
+        pdf.set_text_color(*_rgb(COLORS['dark']))
+        ax, ay = bx + bar_w / 2, py0 + ph + 3
+        with pdf.rotation(45, ax, ay):
+            pdf.text(ax - pdf.get_string_width(label), ay + 1, label)
+
+    # Baseline
+    pdf.set_draw_color(*_rgb(COLORS['gray']))
+    pdf.set_line_width(0.2)
+    pdf.line(px0, py0 + ph, px0 + pw, py0 + ph)
+
+    # Legend (right aligned, one swatch per series)
+    if len(table.columns) > 1 or table.columns[0]:
+        pdf.set_font(FONT, '', 7)
+        entries = [(str(s), palette[j]) for j, s in enumerate(table.columns)]
+        width = sum(pdf.get_string_width(s) + 7 for s, _ in entries)
+        lx = max(px0, x + w - width)
+        for label, color in entries:
+            pdf.set_fill_color(*_rgb(color))
+            pdf.rect(lx, y + 1.5, 3, 3, style='F')
+            pdf.set_text_color(*_rgb(COLORS['dark']))
+            pdf.set_xy(lx + 3.8, y + 1)
+            pdf.cell(pdf.get_string_width(label) + 1, 4, label)
+            lx += pdf.get_string_width(label) + 7
+
+    pdf.set_text_color(0)
+    pdf.set_draw_color(0)
+
+
+def draw_subzone_chart(pdf, rows, x, y, w, h):
+    """Cantidad per subzona, colored by ubicación (Patios / Bodegas)"""
+    draw_bar_chart(pdf, rows, 'subzona', 'ubicacion', LOCATION_COLORS, x, y, w, h,
+                   series_order=list(LOCATION_COLORS))
+
+
+def draw_espacios_chart(pdf, rows, x, y, w, h):
+    """Espacios per subzona, stacked by size (TM)"""
+    size_col = 'subtipo_insumo' if rows is not None and 'subtipo_insumo' in rows.columns else 'insumo'
+    draw_bar_chart(pdf, rows, 'subzona', size_col, SERIES_PALETTE, x, y, w, h, label_inside=True)
+
+
+# Chart kind -> drawing function
+VECTOR_CHARTS = {
+    'subzone': draw_subzone_chart,
+    'espacios': draw_espacios_chart,
+}
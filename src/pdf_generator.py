@@ -1,14 +1,90 @@
-import tempfile
+import io
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from fpdf import FPDF
 from datetime import datetime
 import plotly.io as pio
 
+from src import config
+from src.image_cache import render_image
+from src.pdf_charts import VECTOR_CHARTS
+
 # Constants for layout
 PAGE_WIDTH = 210
 PAGE_HEIGHT = 297
 MARGIN = 10
 
+LOGO_PATH = "assets/yara_logo.png"
+LOGO_WIDTH_MM = 15
+LOGO_DPI = 300
+
+# Chart raster size (px) and concurrent kaleido renders
+CHART_WIDTH = 800
+CHART_HEIGHT = 350
+CHART_SCALE = 2
+RASTER_WORKERS = 4
+
+# Vector charts keep the raster charts' aspect ratio, full text width
+VECTOR_CHART_HEIGHT = (PAGE_WIDTH - 2 * MARGIN) * CHART_HEIGHT / CHART_WIDTH
+
+# Report charts: (figs key, title, vector chart kind), in page order
+CHART_SECTIONS = [
+    ('estibas', "Distribución de Estibas por Subzona", 'subzone'),
+    ('carpas', "Distribución de Carpas por Subzona", 'subzone'),
+    ('plasticos', "Distribución de Plásticos por Subzona", 'subzone'),
+    ('espacios', "Disponibilidad de Espacios", 'espacios'),
+]
+
+
+def _rasterize(fig):
+    # Convert Plotly fig to image (requires kaleido unless already cached)
+    # scale=2 for better resolution
+    return render_image(fig, "png", width=CHART_WIDTH, height=CHART_HEIGHT, scale=CHART_SCALE)
+
+
+@lru_cache(maxsize=1)
+def _logo_png():
+    """
+    Header logo as PNG bytes, decoded and downscaled to its printed size once
+    per process (None if the asset is missing)
+    """
+    if not os.path.exists(LOGO_PATH):
+        return None
+    from PIL import Image  # fpdf2 dependency
+    with Image.open(LOGO_PATH) as im:
+        px = max(1, round(LOGO_WIDTH_MM / 25.4 * LOGO_DPI))
+        if im.width > px:
+            im = im.resize((px, round(im.height * px / im.width)), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def rasterize_figures(figs, max_workers=RASTER_WORKERS):
+    """
+    PNG bytes of every figure, rendered concurrently
+
+    Each kaleido render waits on its own headless browser work, so the
+    figures are handed to a thread pool instead of being rendered one
+    after another.
+
+    Returns:
+        dict: figs key -> PNG bytes, or the exception raised by its render
+    """
+    pending = {name: fig for name, fig in figs.items() if fig is not None}
+    if not pending:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+        futures = {name: pool.submit(_rasterize, fig) for name, fig in pending.items()}
+    images = {}
+    for name, future in futures.items():
+        try:
+            images[name] = future.result()
+        except Exception as e:
+            images[name] = e
+    return images
+
 class PDFReport(FPDF):
     def __init__(self, date_str):
         super().__init__()
@@ -18,10 +94,11 @@ class PDFReport(FPDF):
 
     def header(self):
         # Logo Yara (Left)
-        # Assuming asset path relative to execution
-        logo_path = "assets/yara_logo.png"
-        if os.path.exists(logo_path):
-            self.image(logo_path, x=MARGIN, y=8, w=15) # Small logo
+        # Assuming asset path relative to execution; fpdf2 embeds identical
+        # image bytes once per document, whatever the number of pages
+        logo = _logo_png()
+        if logo is not None:
+            self.image(io.BytesIO(logo), x=MARGIN, y=8, w=LOGO_WIDTH_MM) # Small logo
         
         # Header Text
         self.set_font("Arial", "", 12)
@@ -110,35 +187,63 @@ class PDFReport(FPDF):
         self.line(MARGIN, self.get_y(), PAGE_WIDTH - MARGIN, self.get_y())
         self.ln(5)
 
-    def chapter_chart(self, fig, title):
+    def chapter_chart(self, fig, title, image=None):
+        """image: PNG bytes already rendered from fig (or the render's exception)"""
         if fig is None: return
         
         self.set_font("Arial", "B", 11)
         self.cell(0, 8, title, ln=1)
         
-        # Save fig to temp image
+        # Embed the PNG straight from memory (no temp file)
         try:
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                # Convert Plotly fig to image (requires kaleido)
-                # scale=2 for better resolution
-                img_bytes = fig.to_image(format="png", width=800, height=350, scale=2)
-                tmp.write(img_bytes)
-                tmp_path = tmp.name
+            if isinstance(image, Exception):
+                raise image
+            img_bytes = image if image is not None else _rasterize(fig)
             
-            # Embed in PDF
             # Width = full page width margins
-            self.image(tmp_path, x=MARGIN, w=PAGE_WIDTH - 2*MARGIN)
+            self.image(io.BytesIO(img_bytes), x=MARGIN, w=PAGE_WIDTH - 2*MARGIN)
             self.ln(5)
             
-            # Clean up
-            os.unlink(tmp_path)
-            
         except Exception as e:
             self.set_font("Arial", "I", 10)
             self.cell(0, 10, f"Error generando gráfica: {str(e)}", ln=1)
 
+    def chapter_vector_chart(self, kind, rows, title):
+        """Chart drawn with FPDF primitives from its aggregated rows (see src.pdf_charts)"""
+        self.check_page_break(VECTOR_CHART_HEIGHT + 8)
+        self.set_font("Arial", "B", 11)
+        self.cell(0, 8, title, ln=1)
+        
+        y = self.get_y()
+        VECTOR_CHARTS[kind](self, rows, MARGIN, y, PAGE_WIDTH - 2*MARGIN, VECTOR_CHART_HEIGHT)
+        self.set_xy(MARGIN, y + VECTOR_CHART_HEIGHT + 5)
+
+
+def generate_pdf_report(date_str, kpi_data, figs, chart_data=None, renderer=None):
+    """
+    Balance report PDF
+
+    Args:
+        date_str: Cut date as shown in the header
+        kpi_data: {'estibas', 'carpas', 'plasticos', 'espacios'} KPI dicts
+        figs: {'estibas', 'carpas', 'plasticos', 'espacios'} -> Plotly figure or None
+        chart_data: Same keys -> aggregated rows the figures were built from
+            (cube rows); charts with rows are drawn as vectors
+        renderer: 'vector' or 'kaleido' (defaults to config.PDF_CHART_RENDERER)
+
+    Returns:
+        bytes
+    """
+    renderer = renderer or config.PDF_CHART_RENDERER
+    chart_data = chart_data or {}
+    vector = {
+        name for name, _, _ in CHART_SECTIONS
+        if renderer == 'vector' and chart_data.get(name) is not None
+    }
+
+    # Charts left to kaleido are rasterized up front, in parallel
+    images = rasterize_figures({name: fig for name, fig in figs.items() if name not in vector})
 
-def generate_pdf_report(date_str, kpi_data, figs):
     pdf = PDFReport(date_str)
     
     # KPIs
@@ -150,17 +255,14 @@ def generate_pdf_report(date_str, kpi_data, figs):
     )
     
     # Charts
-    if figs['estibas']:
-        pdf.chapter_chart(figs['estibas'], "Distribución de Estibas por Subzona")
-        
-    if figs['carpas']:
-        pdf.chapter_chart(figs['carpas'], "Distribución de Carpas por Subzona")
-        
-    if figs['plasticos']:
-        pdf.chapter_chart(figs['plasticos'], "Distribución de Plásticos por Subzona")
-        
-    if figs['espacios']:
-        pdf.check_page_break(60) # Ensure space
-        pdf.chapter_chart(figs['espacios'], "Disponibilidad de Espacios")
+    for name, title, kind in CHART_SECTIONS:
+        if name in vector:
+            pdf.chapter_vector_chart(kind, chart_data[name], title)
+            continue
+        if figs.get(name) is None:
+            continue
+        if name == 'espacios':
+            pdf.check_page_break(60) # Ensure space
+        pdf.chapter_chart(figs[name], title, images.get(name))
 
-    return pdf.output(dest='S') # Return as byte string
+    return bytes(pdf.output()) # fpdf2 returns a bytearray
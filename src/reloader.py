@@ -0,0 +1,112 @@
+"""
+SIPOR Dashboard - Background Reloader
+Rebuilds the Dataset off the request path and swaps it in atomically
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class DatasetSnapshot:
+    """
+    One complete, immutable dataset version
+
+    Attributes:
+        dataset: The Dataset (see src.dataset)
+        version: Workbook version token it was built from
+        loaded_at: datetime when the build finished
+        load_seconds: Build duration (read + partition)
+        source_mtime: datetime the workbook was last modified
+    """
+
+    def __init__(self, dataset, version, loaded_at, load_seconds, source_mtime):
+        self.dataset = dataset
+        self.version = version
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+        self.source_mtime = source_mtime
+
+
+class DatasetReloader:
+    """
+    Watches the workbook version and keeps a current DatasetSnapshot
+
+    A daemon thread polls `get_version(file_path)` every `poll_seconds`; when the
+    token changes it builds the new snapshot in the background and publishes it
+    with a single reference assignment. Readers take `current` once and keep
+    using that object, so they always see a complete old or new version (double
+    buffering: the previous snapshot lives as long as someone still holds it).
+
+    `build(file_path, version, previous)` also receives the dataset currently
+    served (or None), so it can extend it when the workbook only gained rows.
+    A failed build keeps the previous snapshot and records `last_error`; it is
+    retried when the workbook changes again.
+    """
+
+    def __init__(self, file_path, build, get_version, poll_seconds=2.0):
+        self.file_path = file_path
+        self.poll_seconds = poll_seconds
+        self.last_error = None
+        self._build = build
+        self._get_version = get_version
+        self._current = None
+        self._attempted_version = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def current(self):
+        """Latest published snapshot (None until the first build finishes)"""
+        return self._current
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"sipor-reloader:{os.path.basename(self.file_path)}",
+                    daemon=True,
+                )
+                self._thread.start()
+        return self
+
+    def wait_ready(self, timeout=None):
+        """Block until a first build has been attempted; returns current snapshot"""
+        self._ready.wait(timeout)
+        return self._current
+
+    def refresh(self):
+        """Check the workbook once and rebuild if its version changed"""
+        version = self._get_version(self.file_path)
+        if version is None:
+            self.last_error = f"Archivo no encontrado: {self.file_path}"
+            return
+        if version == self._attempted_version:
+            return
+
+        self._attempted_version = version
+        start = time.perf_counter()
+        try:
+            previous = self._current.dataset if self._current is not None else None
+            dataset = self._build(self.file_path, version, previous)
+        except Exception as e:
+            self.last_error = str(e)
+            return
+
+        mtime = datetime.fromtimestamp(os.path.getmtime(self.file_path))
+        # Atomic publish: readers see either the old or the new snapshot
+        self._current = DatasetSnapshot(
+            dataset, version, datetime.now(), time.perf_counter() - start, mtime
+        )
+        self.last_error = None
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = str(e)
+            self._ready.set()
+            time.sleep(self.poll_seconds)
@@ -0,0 +1,383 @@
+"""
+SIPOR Dashboard - SQLite Storage Backend
+Base_Operacion imported into an indexed local SQLite database
+"""
+
+import glob
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import (
+    DERIVED_COLUMNS, EVENTOS_REQUIRED, FECHA_INDEX, INVENTARIO_REQUIRED, carry_aggregates, derived_signature,
+    encode_dimensions, unique_labels,
+)
+from src.disk_cache import get_cache_dir
+
+TABLE = 'base_operacion'
+SCHEMA_VERSION = 3
+
+# Record type value of each partition
+PARTITION_TIPO = {'inventario': 'estado', 'eventos': 'evento'}
+
+INDEXES = {
+    'idx_registro_fecha': ('tipo_registro', 'fecha'),
+    'idx_fecha_zona_turno': ('fecha', 'zona', 'turno'),
+    'idx_fecha_insumo': ('fecha', 'insumo'),
+}
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _to_days(value):
+    """Timestamp-like -> integer day number used in the fecha column"""
+    return int((np.datetime64(pd.Timestamp(value), 'D') - _EPOCH).astype(np.int64))
+
+
+def get_db_path(file_path, version):
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(get_cache_dir(file_path), f"{stem}.{version}.sqlite")
+
+
+def _column_sql_types(df):
+    """SQLite storage class per column: dimensions and fecha are stored as integers"""
+    types = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype) or col == 'fecha':
+            types[col] = 'INTEGER'
+        elif pd.api.types.is_integer_dtype(dtype):
+            types[col] = 'INTEGER'
+        elif pd.api.types.is_float_dtype(dtype):
+            types[col] = 'REAL'
+        else:
+            types[col] = 'TEXT'
+    return types
+
+
+def _column_values(series):
+    """Python values for executemany: codes for categoricals, day numbers for fecha"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy().astype(object)
+        codes[codes == -1] = None
+        return codes
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        days = series.to_numpy().astype('datetime64[D]')
+        out = (days - _EPOCH).astype(np.int64).astype(object)
+        out[np.isnat(days)] = None
+        return out
+    values = series.to_numpy(dtype=object)
+    values[pd.isna(series).to_numpy()] = None
+    return values
+
+
+def import_sqlite_dataset(file_path, raw, version):
+    """
+    Import the parsed sheet into `<cache dir>/<workbook>.<version>.sqlite`
+
+    Dimension columns are stored as their dictionary codes (dictionaries in
+    their own table) and fecha as a day number, which keeps the table and its
+    indexes compact. The database is written to a temp file and renamed into
+    place, then databases of previous versions are removed.
+
+    Returns:
+        SqliteDataset
+    """
+    compact = encode_dimensions(raw)
+    db_path = get_db_path(file_path, version)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    tmp_path = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+
+    types = _column_sql_types(compact)
+    columns = list(compact.columns)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(f"CREATE TABLE {TABLE} ({', '.join(f'{_quote(c)} {types[c]}' for c in columns)})")
+        rows = zip(*(_column_values(compact[c]) for c in columns))
+        placeholders = ', '.join('?' for _ in columns)
+        conn.executemany(f"INSERT INTO {TABLE} VALUES ({placeholders})", rows)
+
+        for name, cols in INDEXES.items():
+            if all(c in columns for c in cols):
+                conn.execute(f"CREATE INDEX {name} ON {TABLE} ({', '.join(map(_quote, cols))})")
+
+        conn.execute("CREATE TABLE dictionaries (columna TEXT, code INTEGER, valor TEXT)")
+        conn.executemany(
+            "INSERT INTO dictionaries VALUES (?, ?, ?)",
+            [
+                (col, code, str(value))
+                for col in columns if isinstance(compact[col].dtype, pd.CategoricalDtype)
+                for code, value in enumerate(compact[col].cat.categories)
+            ],
+        )
+
+        meta = {
+            'schema': SCHEMA_VERSION,
+            'version': version,
+            'columns': columns,
+            'cantidad_dtype': str(compact['cantidad'].dtype) if 'cantidad' in compact else None,
+            'derived': derived_signature(),
+        }
+        conn.execute("CREATE TABLE meta (clave TEXT PRIMARY KEY, valor TEXT)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in meta.items()])
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    return _publish(file_path, tmp_path, db_path)
+
+
+def _publish(file_path, tmp_path, db_path):
+    """Rename a finished database into place and prune old versions"""
+    os.replace(tmp_path, db_path)
+
+    # Keep the previous version (readers may still hold its snapshot), drop older ones
+    others = [p for p in glob.glob(get_db_path(file_path, '*')) if p != db_path]
+    others.sort(key=os.path.getmtime, reverse=True)
+    for old in others[1:]:
+        try:
+            os.unlink(old)
+        except OSError:
+            pass
+
+    return SqliteDataset(db_path)
+
+
+def append_sqlite_dataset(file_path, store, delta, version):
+    """
+    New version of the import with rows appended to the sheet
+
+    The previous version's database is copied and only `delta` is encoded and
+    inserted; labels not in a dictionary yet get the next free code, so
+    existing rows and indexes are left as they are.
+
+    Returns:
+        SqliteDataset, or None when `delta` does not fit the stored layout
+        (the caller then imports the whole sheet)
+    """
+    if not isinstance(store, SqliteDataset):
+        return None
+    source_columns = [c for c in store.columns if c not in DERIVED_COLUMNS]
+    if list(delta.columns) != source_columns:
+        return None
+
+    compact = encode_dimensions(delta)
+    db_path = get_db_path(file_path, version)
+    tmp_path = f"{db_path}.{os.getpid()}.tmp"
+    shutil.copyfile(store.db_path, tmp_path)
+
+    columns = store.columns
+    values = []
+    entries = []
+    for col in columns:
+        series = compact[col]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            values.append(_column_values(series))
+            continue
+        known = store.dictionaries.get(col, pd.Index([], dtype=object))
+        labels = pd.Index(series.cat.categories.astype(str))
+        extra = labels[~labels.isin(known)].unique()
+        entries += [(col, len(known) + i, value) for i, value in enumerate(extra)]
+        remap = np.append(known.append(extra).get_indexer(labels), -1)
+        codes = remap[series.cat.codes.to_numpy()].astype(object)
+        codes[codes == -1] = None
+        values.append(codes)
+
+    cantidad_dtype = store.cantidad_dtype
+    if 'cantidad' in compact and cantidad_dtype and str(compact['cantidad'].dtype) != cantidad_dtype:
+        cantidad_dtype = 'float32'
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        placeholders = ', '.join('?' for _ in columns)
+        conn.executemany(f"INSERT INTO {TABLE} VALUES ({placeholders})", zip(*values))
+        conn.executemany("INSERT INTO dictionaries VALUES (?, ?, ?)", entries)
+        conn.executemany(
+            "UPDATE meta SET valor = ? WHERE clave = ?",
+            [(json.dumps(version), 'version'), (json.dumps(cantidad_dtype), 'cantidad_dtype')],
+        )
+        conn.commit()
+    except Exception:
+        conn.close()
+        os.unlink(tmp_path)
+        raise
+    conn.close()
+
+    # Earliest appended fecha per partition: aggregates of `store` that can
+    # extend themselves only re-read the rows from there on
+    since = {}
+    for kind, label in PARTITION_TIPO.items():
+        fechas = compact.loc[(compact['tipo_registro'] == label).to_numpy(), 'fecha'].dropna()
+        since[kind] = fechas.min() if len(fechas) else None
+    return carry_aggregates(store, _publish(file_path, tmp_path, db_path), since)
+
+
+def open_sqlite_dataset(file_path, version):
+    """SqliteDataset for an already imported version, or None"""
+    db_path = get_db_path(file_path, version)
+    if not os.path.exists(db_path):
+        return None
+    try:
+        store = SqliteDataset(db_path)
+    except sqlite3.Error:
+        return None
+    return store if store.version == version else None
+
+
+class SqliteDataset:
+    """
+    Same query interface as src.dataset.Dataset, answered by indexed SQL
+
+    Only the rows a query needs are read back; they are returned with the same
+    layout as the in-memory partitions (categoricals sharing one dictionary per
+    column, sorted DatetimeIndex named FECHA_INDEX) so views work unchanged.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            meta = {k: json.loads(v) for k, v in conn.execute("SELECT clave, valor FROM meta")}
+            if meta.get('schema') != SCHEMA_VERSION:
+                raise sqlite3.DatabaseError("Esquema SQLite desactualizado")
+            if meta.get('derived') != derived_signature():
+                raise sqlite3.DatabaseError("Reglas de códigos derivados cambiaron")
+            dictionaries = {}
+            for col, code, value in conn.execute(
+                "SELECT columna, code, valor FROM dictionaries ORDER BY columna, code"
+            ):
+                dictionaries.setdefault(col, []).append(value)
+
+        self.version = meta['version']
+        self.columns = meta['columns']
+        self.cantidad_dtype = meta.get('cantidad_dtype')
+        self.dictionaries = {col: pd.Index(values) for col, values in dictionaries.items()}
+        self.missing = {
+            'inventario': [c for c in INVENTARIO_REQUIRED if c not in self.columns],
+            'eventos': [c for c in EVENTOS_REQUIRED if c not in self.columns],
+        }
+        self._aggregates = {}
+        self._aggregate_lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        # Read-only connection per call: safe across Streamlit's script threads
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _registro_code(self, kind):
+        categories = self.dictionaries.get('tipo_registro')
+        if categories is None or PARTITION_TIPO[kind] not in categories:
+            return None
+        return int(categories.get_loc(PARTITION_TIPO[kind]))
+
+    def _where(self, kind, start_date=None, end_date=None):
+        """WHERE clause on (tipo_registro, fecha), matching idx_registro_fecha"""
+        clauses = ["tipo_registro = ?", "fecha IS NOT NULL"]
+        params = [self._registro_code(kind)]
+        if start_date is not None:
+            clauses.append("fecha >= ?")
+            params.append(_to_days(start_date))
+        if end_date is not None:
+            clauses.append("fecha <= ?")
+            params.append(_to_days(end_date))
+        return ' AND '.join(clauses), params
+
+    def _decode(self, frame):
+        """SQL rows -> partition layout (categoricals, datetime fecha, sorted index)"""
+        for col in frame.columns:
+            if col in self.dictionaries:
+                codes = frame[col].fillna(-1).to_numpy(dtype=np.int64)
+                frame[col] = pd.Categorical.from_codes(codes, categories=self.dictionaries[col])
+        if 'cantidad' in frame.columns and self.cantidad_dtype:
+            frame['cantidad'] = frame['cantidad'].fillna(0).astype(self.cantidad_dtype)
+        days = frame['fecha'].to_numpy(dtype=np.int64).astype('datetime64[D]')
+        frame['fecha'] = days.astype('datetime64[s]')
+        frame.index = pd.DatetimeIndex(frame['fecha'], name=FECHA_INDEX)
+        return frame
+
+    def _empty_partition(self):
+        frame = pd.DataFrame({c: pd.Series(dtype=object) for c in self.columns})
+        frame['fecha'] = pd.Series(dtype='datetime64[s]')
+        for col in self.dictionaries:
+            frame[col] = pd.Categorical([], categories=self.dictionaries[col])
+        if 'cantidad' in frame.columns and self.cantidad_dtype:
+            frame['cantidad'] = pd.Series(dtype=self.cantidad_dtype)
+        frame.index = pd.DatetimeIndex(frame['fecha'], name=FECHA_INDEX)
+        return frame
+
+    # --- Query interface ---
+
+    def aggregate(self, name, build):
+        with self._aggregate_lock:
+            if name not in self._aggregates:
+                self._aggregates[name] = build(self)
+            return self._aggregates[name]
+
+    def partition(self, kind):
+        return self.between(kind)
+
+    def row_count(self, kind):
+        if self._registro_code(kind) is None:
+            return 0
+        where, params = self._where(kind)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {TABLE} WHERE {where}", params).fetchone()[0]
+
+    def between(self, kind, start_date=None, end_date=None):
+        if self._registro_code(kind) is None:
+            return self._empty_partition()
+        where, params = self._where(kind, start_date, end_date)
+        cols = ', '.join(map(_quote, self.columns))
+        with self._connect() as conn:
+            frame = pd.read_sql_query(
+                f"SELECT {cols} FROM {TABLE} WHERE {where} ORDER BY fecha, rowid", conn, params=params
+            )
+        if frame.empty:
+            return self._empty_partition()
+        return self._decode(frame)
+
+    def snapshot(self, kind, fecha):
+        # Equality on the indexed day column
+        return self.between(kind, fecha, fecha)
+
+    def date_range(self, kind):
+        if self._registro_code(kind) is None:
+            return None, None
+        where, params = self._where(kind)
+        with self._connect() as conn:
+            lo, hi = conn.execute(f"SELECT MIN(fecha), MAX(fecha) FROM {TABLE} WHERE {where}", params).fetchone()
+        if lo is None:
+            return None, None
+        to_ts = lambda d: pd.Timestamp(_EPOCH + np.timedelta64(int(d), 'D'))
+        return to_ts(lo), to_ts(hi)
+
+    def unique_values(self, kind, column, start_date=None, end_date=None):
+        if column not in self.columns or self._registro_code(kind) is None:
+            return []
+        where, params = self._where(kind, start_date, end_date)
+        with self._connect() as conn:
+            values = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT {_quote(column)} FROM {TABLE} WHERE {where}", params
+            )]
+        if column in self.dictionaries:
+            codes = np.array([-1 if v is None else v for v in values], dtype=np.int64)
+            series = pd.Series(pd.Categorical.from_codes(codes, categories=self.dictionaries[column]))
+        else:
+            series = pd.Series(values, dtype=object)
+        return unique_labels(series)
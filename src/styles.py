@@ -34,8 +34,12 @@ COLORS = {
     'gray': '#7F8C8D',
     'yellow_light': '#FFF3CD',
     'blue_light': '#D6EAF8',
+    'grid': '#E0E0E0',    # Chart gridlines
 }
 
+# Bar color per ubicación (Cliente subzone charts and their PDF versions)
+LOCATION_COLORS = {'Patios': COLORS['yellow'], 'Bodegas': COLORS['gray']}
+
 # Gradient Scales for stacked bars
 PATIO_WARM = ['#F5A800', '#F39C12', '#E67E22', '#D35400'] # Yellows to Oranges
 BODEGA_COLD = ['#5D6D7E', '#34495E', '#2E4053', '#1B2631'] # Cool Greys/Blues
@@ -206,13 +210,13 @@ def get_plotly_template():
                 'xanchor': 'left'
             },
             'xaxis': {
-                'gridcolor': '#E0E0E0',
-                'linecolor': '#E0E0E0',
+                'gridcolor': COLORS['grid'],
+                'linecolor': COLORS['grid'],
                 'title': {'font': {'size': 12, 'color': COLORS['gray']}}
             },
             'yaxis': {
-                'gridcolor': '#E0E0E0',
-                'linecolor': '#E0E0E0',
+                'gridcolor': COLORS['grid'],
+                'linecolor': COLORS['grid'],
                 'title': {'font': {'size': 12, 'color': COLORS['gray']}}
             },
             'legend': {
@@ -0,0 +1,553 @@
+"""
+SIPOR Dashboard - Streaming XLSX Reader
+Reads a single worksheet straight from the .xlsx package, row by row
+"""
+
+import hashlib
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_TAG_ROW = f'{{{NS_MAIN}}}row'
+_TAG_C = f'{{{NS_MAIN}}}c'
+_TAG_V = f'{{{NS_MAIN}}}v'
+_TAG_IS = f'{{{NS_MAIN}}}is'
+_TAG_T = f'{{{NS_MAIN}}}t'
+_TAG_SI = f'{{{NS_MAIN}}}si'
+_TAG_RPH = f'{{{NS_MAIN}}}rPh'
+_TAG_DIMENSION = f'{{{NS_MAIN}}}dimension'
+
+# Built-in number formats that Excel renders as dates/times
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+_DATE_FORMAT_RE = re.compile(r'[dmyhs]', re.IGNORECASE)
+_DIMENSION_RE = re.compile(r'[A-Z]*(\d+)$')
+_ROOT_TAG_RE = re.compile(rb'<worksheet\b[^>]*>')
+
+# Column kinds for the typed buffers
+TEXT = 'text'
+NUMBER = 'number'
+DATE = 'date'
+
+# Expected Base_Operacion layout (normalized header -> kind); anything else is read as text
+BASE_OPERACION_TYPES = {
+    'fecha': DATE,
+    'cantidad': NUMBER,
+}
+
+
+def _column_index(letters):
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx - 1
+
+
+def _resolve_sheet_path(zf, sheet_name):
+    """Find the worksheet part for `sheet_name` via workbook.xml and its rels"""
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    rel_id = None
+    for sheet in workbook.iter(f'{{{NS_MAIN}}}sheet'):
+        if sheet.get('name') == sheet_name:
+            rel_id = sheet.get(f'{{{NS_REL}}}id')
+            break
+    if rel_id is None:
+        raise ValueError(f"Hoja no encontrada: {sheet_name}")
+
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    for rel in rels.iter(f'{{{NS_PKG_REL}}}Relationship'):
+        if rel.get('Id') == rel_id:
+            target = rel.get('Target')
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join('xl', target))
+    raise ValueError(f"Relación no encontrada para la hoja: {sheet_name}")
+
+
+def _is_date1904(zf):
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    pr = workbook.find(f'{{{NS_MAIN}}}workbookPr')
+    return pr is not None and pr.get('date1904') in ('1', 'true')
+
+
+def _read_shared_strings(zf):
+    """Shared-string table, parsed incrementally and cleared as it goes"""
+    if 'xl/sharedStrings.xml' not in zf.namelist():
+        return []
+
+    strings = []
+    with zf.open('xl/sharedStrings.xml') as fh:
+        for _, elem in ET.iterparse(fh, events=('end',)):
+            if elem.tag == _TAG_SI:
+                # Rich text runs are concatenated; phonetic hints (rPh) are skipped
+                parts = []
+                for child in elem:
+                    if child.tag == _TAG_T:
+                        parts.append(child.text or '')
+                    elif child.tag != _TAG_RPH:
+                        parts.extend(t.text or '' for t in child.iter(_TAG_T))
+                strings.append(''.join(parts))
+                elem.clear()
+    return strings
+
+
+def _read_date_styles(zf):
+    """Indexes of cellXfs styles whose number format is a date"""
+    if 'xl/styles.xml' not in zf.namelist():
+        return set()
+
+    styles = ET.fromstring(zf.read('xl/styles.xml'))
+    custom_date_fmts = set()
+    num_fmts = styles.find(f'{{{NS_MAIN}}}numFmts')
+    if num_fmts is not None:
+        for fmt in num_fmts:
+            code = re.sub(r'"[^"]*"|\[[^\]]*\]', '', fmt.get('formatCode', ''))
+            if _DATE_FORMAT_RE.search(code):
+                custom_date_fmts.add(int(fmt.get('numFmtId')))
+
+    date_styles = set()
+    cell_xfs = styles.find(f'{{{NS_MAIN}}}cellXfs')
+    if cell_xfs is not None:
+        for i, xf in enumerate(cell_xfs):
+            fmt_id = int(xf.get('numFmtId', 0))
+            if fmt_id in _BUILTIN_DATE_FORMATS or fmt_id in custom_date_fmts:
+                date_styles.add(str(i))
+    return date_styles
+
+
+def _serial_to_timestamp(serial, date1904):
+    origin = pd.Timestamp('1904-01-01' if date1904 else '1899-12-30')
+    return (origin + pd.to_timedelta(serial, unit='D')).round('s')
+
+
+def _cell_column(cell, pos, cache):
+    """Zero-based column of a <c> element, memoizing letter -> index lookups"""
+    ref = cell.get('r')
+    if ref is None:
+        return pos
+    letters = ref.rstrip('0123456789')
+    col = cache.get(letters)
+    if col is None:
+        col = cache[letters] = _column_index(letters)
+    return col
+
+
+def _cell_value(cell, shared_strings):
+    """Decode a <c> element into a Python str/float (None when empty)"""
+    cell_type = cell.get('t')
+    if cell_type == 'inlineStr':
+        node = cell.find(_TAG_IS)
+        return ''.join(t.text or '' for t in node.iter(_TAG_T)) if node is not None else None
+
+    v = cell.find(_TAG_V)
+    if v is None or v.text is None:
+        return None
+    if cell_type == 's':
+        return shared_strings[int(v.text)]
+    if cell_type in ('str', 'd'):
+        return v.text
+    if cell_type == 'e':
+        return None
+    if cell_type == 'b':
+        return float(v.text == '1')
+    return float(v.text)
+
+
+class _ColumnBuffer:
+    """Preallocated, typed storage for one column"""
+
+    def __init__(self, kind, capacity):
+        self.kind = kind
+        if kind == TEXT:
+            self.values = np.empty(capacity, dtype=object)
+        else:
+            self.values = np.full(capacity, np.nan, dtype=np.float64)
+        # Text that landed in a date column (e.g. ISO strings), parsed at the end
+        self.text_dates = {}
+
+    def grow(self, capacity):
+        extra = capacity - len(self.values)
+        if self.kind == TEXT:
+            self.values = np.concatenate([self.values, np.empty(extra, dtype=object)])
+        else:
+            self.values = np.concatenate([self.values, np.full(extra, np.nan)])
+
+    def set(self, row, value):
+        if self.kind == TEXT:
+            self.values[row] = value
+        elif isinstance(value, float):
+            self.values[row] = value
+        elif self.kind == DATE:
+            self.text_dates[row] = value
+        else:
+            try:
+                self.values[row] = float(value.replace(',', '.'))
+            except ValueError:
+                pass
+
+    def to_series(self, n_rows, date1904):
+        values = self.values[:n_rows]
+        if self.kind == TEXT:
+            return pd.Series(values, dtype=object).infer_objects()
+        if self.kind == DATE:
+            origin = '1904-01-01' if date1904 else '1899-12-30'
+            series = pd.to_datetime(values, unit='D', origin=origin, errors='coerce')
+            series = pd.Series(series).dt.round('s')
+            for row, text in self.text_dates.items():
+                if row < n_rows:
+                    series.iloc[row] = pd.to_datetime(text, errors='coerce')
+            return series
+        # Whole numbers come back as int64, like openpyxl + pandas would produce
+        if not np.isnan(values).any() and np.array_equal(values, np.floor(values)):
+            return pd.Series(values.astype(np.int64))
+        return pd.Series(values)
+
+
+def _dedupe_names(names):
+    """Suffix repeated headers with .1, .2... like pandas does"""
+    seen = {}
+    result = []
+    for name in names:
+        count = seen.get(name, 0)
+        result.append(name if count == 0 else f'{name}.{count}')
+        seen[name] = count + 1
+    return result
+
+
+class _RowSink:
+    """Decodes <row> elements into typed column buffers (header row first)"""
+
+    def __init__(self, column_types, shared_strings, date_styles, date1904, names=None):
+        self.column_types = column_types
+        self.shared_strings = shared_strings
+        self.date_styles = date_styles
+        self.date1904 = date1904
+        self.column_cache = {}
+        self.capacity = 0
+        self.n_rows = 0
+        self.names = None
+        self.buffers = []
+        self.width = 0
+        if names is not None:
+            self._set_layout(names)
+
+    def _set_layout(self, names):
+        self.names = names
+        self.width = len(names)
+        kinds = [self.column_types.get(str(n).strip().lower(), TEXT) for n in names]
+        self.buffers = [_ColumnBuffer(kind, self.capacity) for kind in kinds]
+
+    def reserve(self, capacity):
+        """Size the buffers from the sheet <dimension> before the first row"""
+        self.capacity = capacity
+        for buf in self.buffers:
+            buf.grow(capacity)
+
+    def add(self, elem):
+        if self.names is None:
+            # Header row: fixes the column layout and buffer types
+            headers = {}
+            for pos, cell in enumerate(elem.iter(_TAG_C)):
+                col = _cell_column(cell, pos, self.column_cache)
+                value = _cell_value(cell, self.shared_strings)
+                if value is not None:
+                    headers[col] = str(value)
+            width = max(headers) + 1 if headers else 0
+            self._set_layout(_dedupe_names([headers.get(i, f'Unnamed: {i}') for i in range(width)]))
+            return
+
+        if self.n_rows >= self.capacity:
+            self.capacity = max(16, self.capacity * 2)
+            for buf in self.buffers:
+                buf.grow(self.capacity)
+
+        has_value = False
+        for pos, cell in enumerate(elem):
+            col = _cell_column(cell, pos, self.column_cache)
+            if col >= self.width:
+                continue
+            value = _cell_value(cell, self.shared_strings)
+            if value is None:
+                continue
+            buf = self.buffers[col]
+            if buf.kind == TEXT and isinstance(value, float) and cell.get('s') in self.date_styles:
+                # Untyped column: keep the date as a timestamp, as openpyxl would
+                value = _serial_to_timestamp(value, self.date1904)
+            buf.set(self.n_rows, value)
+            has_value = True
+
+        if has_value:
+            self.n_rows += 1
+
+    def to_frame(self):
+        if self.names is None:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            name: buf.to_series(self.n_rows, self.date1904)
+            for name, buf in zip(self.names, self.buffers)
+        })
+
+
+class _SheetDataDigest:
+    """
+    Running SHA-256 of the raw bytes between <sheetData> and </sheetData>
+
+    Fed the decompressed sheet XML chunk by chunk. With a `checkpoint` (the
+    length of the row data seen at the previous load) it also records the
+    digest and the absolute stream offset at that length, which is how an
+    unchanged prefix is verified without parsing it.
+    """
+
+    START = b'<sheetData>'
+    END = b'</sheetData>'
+
+    def __init__(self, checkpoint=None):
+        self.sha = hashlib.sha256()
+        self.length = 0
+        self.state = 'before'  # before -> inside -> after
+        self.start_offset = None
+        self.checkpoint = checkpoint
+        self.checkpoint_sha = None
+        self.checkpoint_offset = None
+        self._offset = 0
+        self._carry = b''
+
+    def update(self, chunk):
+        base = self._offset - len(self._carry)  # absolute offset of data[0]
+        data = self._carry + chunk
+        self._offset += len(chunk)
+        self._carry = b''
+
+        if self.state == 'before':
+            i = data.find(self.START)
+            if i < 0:
+                self._carry = data[-(len(self.START) - 1):]
+                return
+            self.state = 'inside'
+            self.start_offset = base + i + len(self.START)
+            data = data[i + len(self.START):]
+            self._hash(b'')
+
+        if self.state == 'inside':
+            i = data.find(self.END)
+            if i >= 0:
+                self._hash(data[:i])
+                self.state = 'after'
+            else:
+                # Hold back a possible partial end marker
+                keep = min(len(data), len(self.END) - 1)
+                self._hash(data[:len(data) - keep])
+                self._carry = data[len(data) - keep:]
+
+    def _hash(self, body):
+        if self.checkpoint is not None and self.checkpoint_sha is None:
+            need = self.checkpoint - self.length
+            if need <= len(body):
+                self.sha.update(body[:need])
+                self.checkpoint_sha = self.sha.copy().hexdigest()
+                self.checkpoint_offset = self.start_offset + self.checkpoint
+                self.sha.update(body[need:])
+                self.length += len(body)
+                return
+        self.sha.update(body)
+        self.length += len(body)
+
+
+class _DigestingReader:
+    """File-like wrapper feeding every chunk read through a _SheetDataDigest"""
+
+    def __init__(self, fh, digest):
+        self.fh = fh
+        self.digest = digest
+
+    def read(self, size=-1):
+        chunk = self.fh.read(size)
+        self.digest.update(chunk)
+        return chunk
+
+
+def _strings_digest(strings, count=None):
+    digest = hashlib.sha256()
+    for text in strings[:count]:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def _sheet_state(sink, digest, shared_strings, date1904, rows):
+    """What a later read needs to verify and skip the rows parsed so far"""
+    return {
+        'rows': rows,
+        'names': sink.names,
+        'data_len': digest.length,
+        'data_sha256': digest.sha.hexdigest(),
+        'strings': len(shared_strings),
+        'strings_sha256': _strings_digest(shared_strings),
+        'date1904': date1904,
+    }
+
+
+def _read_appended(zf, sheet_path, sink, state):
+    """
+    Parse only the rows written after `state`; None if earlier rows changed
+
+    The decompressed XML is streamed through the digest (no XML parsing) up to
+    the previous end of the row data; only the bytes after it go through an
+    XMLPullParser primed with the original root tag, so namespaces resolve.
+
+    Returns:
+        _SheetDataDigest covering the whole row data, or None
+    """
+    digest = _SheetDataDigest(checkpoint=state['data_len'])
+    parser = None
+    head = b''
+    root_tag = None
+    prev = b''
+    offset = 0  # absolute offset of `chunk`
+
+    with zf.open(sheet_path) as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b''):
+            digest.update(chunk)
+            if root_tag is None:
+                head += chunk
+                match = _ROOT_TAG_RE.search(head)
+                if match:
+                    root_tag, head = match.group(0), b''
+
+            if parser is not None:
+                parser.feed(chunk)
+            elif digest.checkpoint_offset is not None:
+                if digest.checkpoint_sha != state['data_sha256'] or root_tag is None:
+                    return None
+                parser = ET.XMLPullParser(events=('end',))
+                parser.feed(root_tag + _SheetDataDigest.START)
+                # The checkpoint can sit in bytes the digest carried over from `prev`
+                window = prev + chunk
+                parser.feed(window[digest.checkpoint_offset - (offset - len(prev)):])
+
+            if parser is not None:
+                for _, elem in parser.read_events():
+                    if elem.tag == _TAG_ROW:
+                        sink.add(elem)
+                        elem.clear()
+            prev = chunk
+            offset += len(chunk)
+
+    # The old rows must still be followed by the end of the row data
+    if parser is None or digest.state != 'after':
+        return None
+    return digest
+
+
+def read_sheet_state(file_path, sheet_name='Base_Operacion', column_types=None, previous=None):
+    """
+    Stream a worksheet, resuming after the rows of a previous read if possible
+
+    `previous` is the state returned by an earlier call. Appended rows are
+    detected from it: if the shared strings and the raw bytes of every row read
+    back then are unchanged (row count and SHA-256 of the row data), only the
+    new rows are parsed. Anything else (an edited, deleted or re-ordered row)
+    falls back to a full read.
+
+    Returns:
+        tuple: (DataFrame, state, appended) - with appended=True the frame
+        holds only the new rows
+    """
+    column_types = column_types or {}
+
+    with zipfile.ZipFile(file_path) as zf:
+        sheet_path = _resolve_sheet_path(zf, sheet_name)
+        date1904 = _is_date1904(zf)
+        shared_strings = _read_shared_strings(zf)
+        date_styles = _read_date_styles(zf)
+
+        if (
+            previous
+            and previous.get('names')
+            and previous.get('date1904') == date1904
+            and previous.get('strings', 0) <= len(shared_strings)
+            and _strings_digest(shared_strings, previous['strings']) == previous.get('strings_sha256')
+        ):
+            sink = _RowSink(column_types, shared_strings, date_styles, date1904, names=previous['names'])
+            digest = _read_appended(zf, sheet_path, sink, previous)
+            if digest is not None:
+                state = _sheet_state(sink, digest, shared_strings, date1904, previous['rows'] + sink.n_rows)
+                return sink.to_frame(), state, True
+
+        sink = _RowSink(column_types, shared_strings, date_styles, date1904)
+        digest = _SheetDataDigest()
+        with zf.open(sheet_path) as fh:
+            for _, elem in ET.iterparse(_DigestingReader(fh, digest), events=('end',)):
+                tag = elem.tag
+                if tag == _TAG_DIMENSION:
+                    match = _DIMENSION_RE.search(elem.get('ref', ''))
+                    sink.reserve(max(int(match.group(1)) - 1, 0) if match else 0)
+                elif tag == _TAG_ROW:
+                    sink.add(elem)
+                    elem.clear()
+
+    return sink.to_frame(), _sheet_state(sink, digest, shared_strings, date1904, sink.n_rows), False
+
+
+def read_sheet(file_path, sheet_name='Base_Operacion', column_types=None):
+    """
+    Stream one worksheet into a DataFrame without loading the rest of the workbook
+
+    Only the target sheet XML, the shared-string table and the style table are
+    read. Rows are decoded one at a time (iterparse, elements cleared as they are
+    consumed) into per-column buffers preallocated from the sheet <dimension>.
+
+    Args:
+        file_path: Path to the .xlsx file
+        sheet_name: Worksheet to read; the first row is the header
+        column_types: Optional {normalized header: TEXT | NUMBER | DATE};
+            cells whose style is a date format are always read as dates
+
+    Returns:
+        pd.DataFrame: One column per header cell, fully empty rows dropped
+    """
+    return read_sheet_state(file_path, sheet_name, column_types)[0]
+
+
+def iter_sheet(file_path, sheet_name, column_types=None, chunk_rows=50_000):
+    """
+    Stream a worksheet as DataFrames of at most `chunk_rows` rows
+
+    Same decoding as read_sheet, but only one chunk is held in memory, so
+    sheets of any size can be processed.
+
+    Yields:
+        pd.DataFrame: Consecutive row chunks, all with the header's columns
+    """
+    column_types = column_types or {}
+
+    with zipfile.ZipFile(file_path) as zf:
+        sheet_path = _resolve_sheet_path(zf, sheet_name)
+        date1904 = _is_date1904(zf)
+        shared_strings = _read_shared_strings(zf)
+        date_styles = _read_date_styles(zf)
+
+        sink = _RowSink(column_types, shared_strings, date_styles, date1904)
+        sink.reserve(chunk_rows)
+        yielded = False
+        with zf.open(sheet_path) as fh:
+            for _, elem in ET.iterparse(fh, events=('end',)):
+                if elem.tag != _TAG_ROW:
+                    continue
+                sink.add(elem)
+                elem.clear()
+                if sink.n_rows == chunk_rows:
+                    yield sink.to_frame()
+                    yielded = True
+                    sink = _RowSink(column_types, shared_strings, date_styles, date1904, names=sink.names)
+                    sink.reserve(chunk_rows)
+
+        if sink.n_rows or not yielded:
+            yield sink.to_frame()
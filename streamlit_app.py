@@ -2,6 +2,7 @@ import streamlit as st
 
 from src.cliente import render_cliente_view
 from src.styles import apply_custom_css
+from src.loader import show_data_status
 
 # ---------------------------
 # Configuración general
@@ -16,5 +17,7 @@ apply_custom_css()
 # ---------------------------
 # Vista Cliente (ÚNICA)
 # ---------------------------
+show_data_status()
+
 render_cliente_view()
 
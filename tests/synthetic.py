@@ -0,0 +1,28 @@
+"""
+SIPOR Dashboard - Test data
+Synthetic Base_Operacion frames shared by the tests
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_frame(rows, days, seed, start='2025-01-01', extra_zona=None):
+    """Base_Operacion-like frame with missing labels, mixed-case event types and undated rows"""
+    rng = np.random.default_rng(seed)
+    zonas = ['Patio Norte', 'Bodega 1', 'Muelle'] + ([extra_zona] if extra_zona else [])
+    df = pd.DataFrame({
+        'fecha': pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, rows), unit='D'),
+        'zona': rng.choice(zonas, rows).astype(object),
+        'subzona': rng.choice([f'Subzona {i}' for i in range(6)], rows),
+        'subtipo_insumo': rng.choice(['77 TM', '35 TM', 'NICA'], rows),
+        'cantidad': rng.integers(0, 100, rows),
+        'tipo_registro': rng.choice(['estado', 'evento', ' Estado'], rows),
+        'estado': rng.choice(['disponible', 'reparar', 'clasificar'], rows),
+        'tipo_evento': rng.choice(['reparada', 'Baja ', 'baja'], rows),
+        'insumo': rng.choice(['estiba', 'carpa', 'plástico', 'espacio'], rows),
+        'turno': rng.choice(['AM', 'PM'], rows).astype(object),
+    })
+    df.loc[rng.random(rows) < 0.05, 'turno'] = None
+    df.loc[rng.random(rows) < 0.02, 'fecha'] = pd.NaT
+    return df
@@ -0,0 +1,71 @@
+"""
+SIPOR Dashboard - Backend parity
+The in-memory Dataset and the SqliteDataset answer every query the same way,
+after a full import and after appending rows
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dataset import append_rows, build_dataset
+from src.sqlite_store import append_sqlite_dataset, import_sqlite_dataset
+from synthetic import synthetic_frame
+
+KINDS = ['inventario', 'eventos']
+COLUMNS = ['zona', 'subzona', 'insumo', 'turno', 'estado', 'tipo_evento', 'ubicacion', 'categoria']
+
+
+def comparable(df):
+    """Partition as plain values: categoricals as labels, no index, cantidad as float"""
+    out = df.reset_index(drop=True).copy()
+    for col in out.columns:
+        if isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(object).where(out[col].notna(), None)
+    if 'cantidad' in out.columns:
+        out['cantidad'] = out['cantidad'].astype(np.float64)
+    return out
+
+
+def assert_same_queries(memory, sqlite):
+    for kind in KINDS:
+        assert memory.row_count(kind) == sqlite.row_count(kind)
+        assert memory.date_range(kind) == sqlite.date_range(kind)
+        pd.testing.assert_frame_equal(comparable(memory.between(kind)), comparable(sqlite.between(kind)))
+
+        first, last = memory.date_range(kind)
+        start, end = first + pd.Timedelta(days=3), last - pd.Timedelta(days=5)
+        pd.testing.assert_frame_equal(
+            comparable(memory.between(kind, start, end)), comparable(sqlite.between(kind, start, end))
+        )
+        for fecha in (first, start, last, last + pd.Timedelta(days=1)):
+            pd.testing.assert_frame_equal(
+                comparable(memory.snapshot(kind, fecha)), comparable(sqlite.snapshot(kind, fecha))
+            )
+        for column in COLUMNS:
+            assert memory.unique_values(kind, column) == sqlite.unique_values(kind, column)
+            assert memory.unique_values(kind, column, start, end) == sqlite.unique_values(kind, column, start, end)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    # The SQLite databases are written to the cache folder next to this path
+    return str(tmp_path / 'Balance_Insumos.xlsx')
+
+
+def test_import_parity(workbook):
+    raw = synthetic_frame(3000, 60, seed=1)
+    assert_same_queries(build_dataset(raw, version='v1'), import_sqlite_dataset(workbook, raw, 'v1'))
+
+
+@pytest.mark.parametrize('start', ['2025-03-01', '2025-01-20'], ids=['forward', 'back_in_time'])
+def test_append_parity(workbook, start):
+    raw = synthetic_frame(3000, 60, seed=1)
+    delta = synthetic_frame(400, 10, seed=2, start=start, extra_zona='Bodega Nueva')
+    delta['cantidad'] = delta['cantidad'] + 0.5  # int32 -> float32 on append
+
+    memory = append_rows(build_dataset(raw, version='v1'), delta, version='v2')
+    sqlite = append_sqlite_dataset(workbook, import_sqlite_dataset(workbook, raw, 'v1'), delta, 'v2')
+    assert sqlite is not None and sqlite.version == 'v2'
+    assert_same_queries(memory, sqlite)
+    assert_same_queries(memory, build_dataset(pd.concat([raw, delta], ignore_index=True), version='v2'))
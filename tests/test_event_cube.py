@@ -0,0 +1,66 @@
+"""
+SIPOR Dashboard - Event prefix sums
+EventPrefixSums extended through append_rows answers like one built over the whole sheet
+"""
+
+import pandas as pd
+import pytest
+
+from src.dataset import append_rows, build_dataset
+from src.event_cube import AGGREGATE_NAME, get_event_prefix
+from synthetic import synthetic_frame
+
+# name -> (first appended day, days covered, extra zona); the base frame covers 2025-01-01..2025-03-01
+APPENDS = {
+    'forward': ('2025-03-05', 4, None),
+    'same_day': ('2025-03-01', 1, None),
+    'back_dated': ('2025-01-20', 10, None),
+    'new_label': ('2025-03-02', 3, 'Bodega Nueva'),
+    'before_history': ('2024-12-20', 5, 'Bodega Nueva'),
+}
+SELECTIONS = [
+    {},
+    {'turno': ['AM']},
+    {'zona': ['Bodega Nueva', 'Muelle'], 'turno': ['PM', 'N/A']},
+]
+
+
+def extended_and_rebuilt(delta):
+    raw = synthetic_frame(4000, 60, seed=1)
+    previous = build_dataset(raw, version='v1')
+    get_event_prefix(previous)
+    appended = append_rows(previous, delta, version='v2')
+    assert AGGREGATE_NAME in appended._aggregates  # carried over, not rebuilt on first use
+    full = build_dataset(pd.concat([raw, delta], ignore_index=True), version='v2')
+    return get_event_prefix(appended), get_event_prefix(full), full.date_range('eventos')
+
+
+def assert_same_windows(extended, rebuilt, first, last):
+    ranges = [(first, last), (first + pd.Timedelta(days=4), last - pd.Timedelta(days=2)),
+              (last - pd.Timedelta(days=1), last + pd.Timedelta(days=3))]
+    for start, end in ranges:
+        for selection in SELECTIONS:
+            a = extended.window(start, end, extended.group_mask(**selection))
+            b = rebuilt.window(start, end, rebuilt.group_mask(**selection))
+            assert a.total() == b.total()
+            assert a.total('Baja') == b.total('Baja')
+            assert a.labels('zona') == b.labels('zona')
+            for dims in [('turno',), ('zona', 'tipo_evento')]:
+                pd.testing.assert_frame_equal(a.sum_by(*dims), b.sum_by(*dims))
+            pd.testing.assert_frame_equal(a.daily('tipo_evento'), b.daily('tipo_evento'))
+
+
+@pytest.mark.parametrize('name', list(APPENDS))
+def test_extend_matches_rebuild(name):
+    start, days, extra_zona = APPENDS[name]
+    delta = synthetic_frame(400, days, seed=2, start=start, extra_zona=extra_zona)
+    extended, rebuilt, (first, last) = extended_and_rebuilt(delta)
+    assert_same_windows(extended, rebuilt, first, last)
+
+
+@pytest.mark.parametrize('tipo', ['estado', 'evento'])
+def test_extend_with_one_partition_appended(tipo):
+    delta = synthetic_frame(400, 3, seed=3, start='2025-03-02', extra_zona='Bodega Nueva')
+    delta = delta[delta['tipo_registro'].str.strip().str.lower() == tipo].reset_index(drop=True)
+    extended, rebuilt, (first, last) = extended_and_rebuilt(delta)
+    assert_same_windows(extended, rebuilt, first, last)
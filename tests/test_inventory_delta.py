@@ -0,0 +1,57 @@
+"""
+SIPOR Dashboard - Inventory deltas
+InventoryPivot extended through append_rows answers like one built over the whole sheet
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dataset import append_rows, build_dataset
+from src.inventory_delta import AGGREGATE_NAME, get_inventory_pivot
+from synthetic import synthetic_frame
+
+# name -> (first appended day, days covered, extra zona); the base frame covers 2025-01-01..2025-03-01
+APPENDS = {
+    'forward': ('2025-03-05', 4, None),
+    'same_day': ('2025-03-01', 1, None),
+    'back_dated': ('2025-01-20', 10, None),
+    'new_label': ('2025-03-02', 3, 'Bodega Nueva'),
+    'back_dated_new_label': ('2024-12-20', 20, 'Bodega Nueva'),
+    'events_only': ('2025-03-02', 3, None),
+}
+
+
+def extended_and_rebuilt(delta):
+    raw = synthetic_frame(4000, 60, seed=1)
+    previous = build_dataset(raw, version='v1')
+    get_inventory_pivot(previous)
+    appended = append_rows(previous, delta, version='v2')
+    assert AGGREGATE_NAME in appended._aggregates  # carried over, not rebuilt on first use
+    full = build_dataset(pd.concat([raw, delta], ignore_index=True), version='v2')
+    return get_inventory_pivot(appended), get_inventory_pivot(full)
+
+
+@pytest.mark.parametrize('name', list(APPENDS))
+def test_extend_matches_rebuild(name):
+    start, days, extra_zona = APPENDS[name]
+    delta = synthetic_frame(400, days, seed=2, start=start, extra_zona=extra_zona)
+    if name == 'events_only':
+        delta = delta[delta['tipo_registro'] == 'evento'].reset_index(drop=True)
+    extended, rebuilt = extended_and_rebuilt(delta)
+
+    assert np.array_equal(extended.dates, rebuilt.dates)
+    assert extended.grains == rebuilt.grains
+    dates = rebuilt.dates
+    pairs = [(dates[0], dates[-1]), (dates[len(dates) // 2], dates[-1]), (dates[-2], dates[-1])]
+    for grain in rebuilt.grains:
+        assert list(extended.labels[grain]) == list(rebuilt.labels[grain])
+        for start_date, end_date in pairs:
+            pd.testing.assert_frame_equal(
+                extended.delta(grain, start_date, end_date), rebuilt.delta(grain, start_date, end_date)
+            )
+            for increases in (True, False):
+                pd.testing.assert_frame_equal(
+                    extended.top(grain, start_date, end_date, n=3, increases=increases),
+                    rebuilt.top(grain, start_date, end_date, n=3, increases=increases),
+                )
@@ -0,0 +1,90 @@
+"""
+SIPOR Dashboard - Incremental workbook reads
+Rows appended at the end of Base_Operacion are parsed alone; any other edit re-parses the sheet
+"""
+
+import re
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from src.disk_cache import file_sha256
+from src.loader import ingest_base_operacion
+
+SHEET_XML = 'xl/worksheets/sheet1.xml'
+HEADER = ['fecha', 'zona', 'subzona', 'insumo', 'cantidad', 'tipo_registro', 'estado', 'tipo_evento', 'turno']
+ROW_RE = re.compile(rb'<row r="(\d+)".*?</row>', re.S)
+
+
+def sheet_rows(n, first=0):
+    return [
+        [pd.Timestamp('2025-01-01') + pd.Timedelta(days=i % 20), 'Patio Norte' if i % 3 else 'Bodega 1',
+         f'Subzona {i % 4}', 'estiba', i, 'estado' if i % 2 else 'evento', 'disponible', 'reparada', 'AM']
+        for i in range(first, first + n)
+    ]
+
+
+def write_workbook(path, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'Base_Operacion'
+    ws.append(HEADER)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def rewrite_sheet(path, transform):
+    """Replace the Base_Operacion XML in place, every other part copied byte for byte"""
+    with zipfile.ZipFile(path) as zf:
+        parts = [(info, zf.read(info.filename)) for info in zf.infolist()]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for info, data in parts:
+            zf.writestr(info, transform(data) if info.filename == SHEET_XML else data)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = str(tmp_path / 'Balance_Insumos.xlsx')
+    write_workbook(path, sheet_rows(50))
+    frame, delta = ingest_base_operacion(path)
+    assert delta is None and len(frame) == 50
+    return path
+
+
+def test_appended_rows_are_parsed_alone(workbook, tmp_path):
+    have_version = file_sha256(workbook)[:16]
+
+    # <row> elements of the same sheet written with 8 more rows, spliced in before </sheetData>
+    longer = str(tmp_path / 'longer.xlsx')
+    write_workbook(longer, sheet_rows(58))
+    with zipfile.ZipFile(longer) as zf:
+        new_rows = b''.join(m.group(0) for m in ROW_RE.finditer(zf.read(SHEET_XML)) if int(m.group(1)) > 51)
+    rewrite_sheet(workbook, lambda xml: xml.replace(b'</sheetData>', new_rows + b'</sheetData>'))
+
+    frame, delta = ingest_base_operacion(workbook, have_version=have_version)
+    assert frame is None
+    assert delta['cantidad'].tolist() == list(range(50, 58))
+    assert delta['zona'].tolist() == [row[1] for row in sheet_rows(8, first=50)]
+
+    # The cache now holds the whole sheet
+    frame, delta = ingest_base_operacion(workbook)
+    assert delta is None and frame['cantidad'].tolist() == list(range(58))
+
+
+def test_edited_row_forces_full_parse(workbook):
+    have_version = file_sha256(workbook)[:16]
+
+    def edit_second_row(xml):
+        row = ROW_RE.search(xml, xml.index(b'<row r="3"'))
+        return xml[:row.start()] + row.group(0).replace(b'Patio Norte', b'Patio Sur') + xml[row.end():]
+
+    rewrite_sheet(workbook, edit_second_row)
+
+    frame, delta = ingest_base_operacion(workbook, have_version=have_version)
+    assert delta is None
+    assert len(frame) == 50
+    assert frame['zona'].iloc[1] == 'Patio Sur'
+    assert frame['cantidad'].tolist() == list(range(50))